@@ -0,0 +1,250 @@
+"""
+压缩去重的备份归档
+
+每个文件按内容 SHA-256 存为一个独立压缩对象（优先 zstd，未安装 zstandard 时用 gzip），
+内容相同的文件只存一份。每次备份写一个快照清单，记录文件名到对象的映射。
+读取历史版本时只解压对应的单个对象，并且是流式解压。
+
+目录结构:
+    backup/archive/
+    ├── objects/ab/ab12...ef.gz     # 按内容寻址的压缩对象
+    └── snapshots/20250910_092440.json
+
+命令行:
+    python BackupArchive.py list                       # 所有快照
+    python BackupArchive.py show <快照>                 # 快照内的文件
+    python BackupArchive.py cat <快照> <文件名> > out    # 流式输出某个历史文件
+    python BackupArchive.py extract <快照> [目标目录]
+    python BackupArchive.py import backup/20250910_092149 ...   # 导入旧的目录式备份
+    python BackupArchive.py stats                      # 原始大小与实际占用
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+
+import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupArchive:
+    def __init__(self, root=None, codec=None, level=None):
+        """
+        :param root: 归档目录，默认 backup/archive
+        :param codec: zstd / gzip / auto，默认读取 config.ini [backup] codec
+        :param level: 压缩级别，默认 zstd 10、gzip 6
+        """
+        self.root = root or settings.get_str("backup", "archiveDir", fallback=os.path.join("backup", "archive"))
+        codec = codec or settings.get_str("backup", "codec", fallback="auto")
+        if codec == "auto":
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("配置使用 zstd 压缩，但未安装 zstandard")
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"不支持的压缩格式: {codec}")
+        self.codec = codec
+        self.level = level if level is not None else (10 if codec == "zstd" else 6)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.snapshots_dir = os.path.join(self.root, "snapshots")
+
+    # ------------------ 对象 ------------------
+    def _object_path(self, digest, codec):
+        return os.path.join(self.objects_dir, digest[:2], digest + CODEC_EXTENSIONS[codec])
+
+    def _find_object(self, digest):
+        """查找已存在的对象（任意压缩格式），返回 (路径, 格式)"""
+        for codec in CODEC_EXTENSIONS:
+            path = self._object_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    @staticmethod
+    def _hash_file(file_path):
+        digest = hashlib.sha256()
+        size = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _compress(self, file_path, object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(file_path, "rb") as src, open(tmp_path, "wb") as raw:
+                if self.codec == "zstd":
+                    compressor = zstandard.ZstdCompressor(level=self.level)
+                    with compressor.stream_writer(raw, closefd=False) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                else:
+                    # mtime 固定为 0，相同内容压缩结果一致
+                    with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.level, mtime=0) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, object_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def store_file(self, file_path):
+        """存入单个文件，内容已存在时直接复用，返回清单条目"""
+        digest, size = self._hash_file(file_path)
+        object_path, codec = self._find_object(digest)
+        stored = object_path is not None
+        if not stored:
+            codec = self.codec
+            object_path = self._object_path(digest, codec)
+            self._compress(file_path, object_path)
+        return {
+            "sha256": digest,
+            "size": size,
+            "codec": codec,
+            "compressed_size": os.path.getsize(object_path),
+            "deduplicated": stored,
+        }
+
+    # ------------------ 快照 ------------------
+    def _snapshot_path(self, snapshot):
+        return os.path.join(self.snapshots_dir, f"{snapshot}.json")
+
+    def archive_files(self, files, snapshot=None, remove=False):
+        """
+        归档一组文件到快照，快照已存在时合并
+        :param files: 文件路径列表，或 {归档内文件名: 文件路径}
+        :param snapshot: 快照名，默认当前时间
+        :param remove: 归档后删除原文件
+        :return: 快照名
+        """
+        snapshot = snapshot or datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not isinstance(files, dict):
+            files = {os.path.basename(path): path for path in files}
+
+        manifest = self.manifest(snapshot) if os.path.exists(self._snapshot_path(snapshot)) else {
+            "snapshot": snapshot, "created_at": datetime.now().isoformat(timespec="seconds"), "files": {}
+        }
+        for name, path in files.items():
+            if not os.path.exists(path):
+                continue
+            entry = self.store_file(path)
+            manifest["files"][name.replace(os.sep, "/")] = entry
+            print(f"已归档 {path} → {snapshot}/{name}" + ("（内容未变化，已去重）" if entry["deduplicated"] else ""))
+
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        snapshot_path = self._snapshot_path(snapshot)
+        tmp_path = f"{snapshot_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+
+        if remove:
+            for path in files.values():
+                if os.path.isfile(path):
+                    os.remove(path)
+        return snapshot
+
+    def import_directory(self, backup_dir, remove=False):
+        """导入旧的 backup/<时间>/ 目录式备份，快照名沿用目录名"""
+        files = {}
+        for dirpath, _, filenames in os.walk(backup_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                files[os.path.relpath(path, backup_dir)] = path
+        snapshot = self.archive_files(files, snapshot=os.path.basename(os.path.normpath(backup_dir)))
+        if remove:
+            shutil.rmtree(backup_dir)
+        return snapshot
+
+    def snapshots(self):
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def manifest(self, snapshot):
+        with open(self._snapshot_path(snapshot), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # ------------------ 读取 ------------------
+    def open_file(self, snapshot, name):
+        """以流的方式打开某个快照中的文件（二进制只读），只解压这一个对象"""
+        entry = self.manifest(snapshot)["files"].get(name)
+        if entry is None:
+            raise FileNotFoundError(f"快照 {snapshot} 中没有文件: {name}")
+        object_path = self._object_path(entry["sha256"], entry["codec"])
+        if entry["codec"] == "zstd":
+            if zstandard is None:
+                raise ImportError("读取 zstd 压缩的备份需要安装 zstandard")
+            return zstandard.ZstdDecompressor().stream_reader(open(object_path, "rb"), closefd=True)
+        return gzip.open(object_path, "rb")
+
+    def extract(self, snapshot, dest_dir, names=None):
+        """解压快照中的文件到目标目录"""
+        files = self.manifest(snapshot)["files"]
+        for name in names or files:
+            target = os.path.join(dest_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            with self.open_file(snapshot, name) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return dest_dir
+
+    def stats(self):
+        """快照中文件原始总大小与对象实际占用"""
+        logical = 0
+        for snapshot in self.snapshots():
+            logical += sum(entry["size"] for entry in self.manifest(snapshot)["files"].values())
+        stored = 0
+        objects = 0
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                stored += os.path.getsize(os.path.join(dirpath, filename))
+                objects += 1
+        return {"snapshots": len(self.snapshots()), "objects": objects, "logical_bytes": logical, "stored_bytes": stored}
+
+
+def main(argv):
+    archive = BackupArchive()
+    command = argv[0] if argv else "list"
+    if command == "list":
+        for snapshot in archive.snapshots():
+            files = archive.manifest(snapshot)["files"]
+            print(f"{snapshot}  {len(files)} 个文件  {sum(e['size'] for e in files.values())} 字节")
+    elif command == "show" and len(argv) > 1:
+        for name, entry in archive.manifest(argv[1])["files"].items():
+            print(f"{name}  {entry['size']} → {entry['compressed_size']} 字节  {entry['sha256'][:12]}")
+    elif command == "cat" and len(argv) > 2:
+        with archive.open_file(argv[1], argv[2]) as src:
+            shutil.copyfileobj(src, sys.stdout.buffer, CHUNK_SIZE)
+    elif command == "extract" and len(argv) > 1:
+        print(f"已解压到 {archive.extract(argv[1], argv[2] if len(argv) > 2 else argv[1])}")
+    elif command == "import" and len(argv) > 1:
+        for backup_dir in argv[1:]:
+            archive.import_directory(backup_dir)
+    elif command == "stats":
+        stats = archive.stats()
+        ratio = stats["stored_bytes"] / stats["logical_bytes"] if stats["logical_bytes"] else 0
+        print(f"快照 {stats['snapshots']} 个，对象 {stats['objects']} 个，"
+              f"原始 {stats['logical_bytes']} 字节，实际占用 {stats['stored_bytes']} 字节 ({ratio:.1%})")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,167 @@
+"""
+课表时间地点冲突检测
+
+按 (标准化教室, 星期, 节次) 建立索引，同一槽位内用周次位掩码求交集，
+找出所有周次重叠的课程对。同一门课在同一槽位出现多次（多个班级合班上课）
+视为合班，只计数不作为冲突。冲突较少时整体接近线性时间。
+
+命令行:
+    python ConflictDetector.py tableInfo.json     # 检测并输出冲突
+    python ConflictDetector.py --verify           # 校验教室键不会合并不同教室
+"""
+import json
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from CourseRecord import CourseRecord, UNKNOWN_LOCATION, mask_to_weeks
+from ScheduleParser import normalize_classroom_name
+
+
+class ConflictDetector:
+    def __init__(self, normalize=normalize_classroom_name):
+        """
+        :param normalize: 教室名称标准化函数 normalize(地点, exact=False)，返回含 building/room_id 的字典，
+                          无法识别时返回 None
+        """
+        self.normalize = normalize
+        self._room_keys = {}  # 原始地点 -> 教室键（或 None）
+        # {(教室键, 星期, 节次): {课程名: [周次并集, [记录...]]}}
+        self._slots = {}
+
+        self.total = 0
+        self.checked = 0
+        self.skipped = 0
+        self.merged_classes = 0
+        self.conflicts = []
+
+    def _room_key(self, location: str):
+        """
+        教室键：非教室地点为 None；整个地点能被标准化时为 “教学楼+教室号”，
+        使 7B101 与 7号楼B101 视为同一教室；否则使用原始地点，不同教室不会被合并
+        """
+        if location not in self._room_keys:
+            if self.normalize(location) is None:
+                key = None
+            else:
+                location_str = location.strip()
+                room_info = self.normalize(location_str, exact=True)
+                key = f"{room_info['building']}{room_info['room_id']}" if room_info else location_str
+            self._room_keys[location] = key
+        return self._room_keys[location]
+
+    def add(self, record: CourseRecord) -> None:
+        self.total += 1
+        if record.class_room in (UNKNOWN_LOCATION, "") or not record.week_mask:
+            self.skipped += 1
+            return
+        room_key = self._room_key(record.class_room)
+        if room_key is None:
+            # 校内各区域、实验室等非教室地点不参与冲突检测
+            self.skipped += 1
+            return
+        self.checked += 1
+
+        courses = self._slots.setdefault((room_key, record.weekday, record.section), {})
+        mask = record.week_mask
+        for course_name, (course_mask, records) in courses.items():
+            if not mask & course_mask:
+                continue
+            if course_name == record.course_name:
+                self.merged_classes += 1
+                continue
+            for other in records:
+                overlap = mask & other.week_mask
+                if overlap:
+                    self.conflicts.append({
+                        "room": room_key,
+                        "weekDay": record.weekday_name,
+                        "section": record.section_name,
+                        "weeks": mask_to_weeks(overlap),
+                        "first": other,
+                        "second": record,
+                    })
+
+        group = courses.get(record.course_name)
+        if group is None:
+            courses[record.course_name] = [mask, [record]]
+        else:
+            group[0] |= mask
+            group[1].append(record)
+
+    def detect(self, records: Iterable[CourseRecord]) -> List[Dict]:
+        for record in records:
+            self.add(record)
+        return self.conflicts
+
+    # ------------------ 输出 ------------------
+    def report(self) -> Dict:
+        by_room = {}
+        for conflict in self.conflicts:
+            by_room[conflict["room"]] = by_room.get(conflict["room"], 0) + 1
+        return {
+            "total_records": self.total,
+            "checked_records": self.checked,
+            "skipped_records": self.skipped,
+            "merged_classes": self.merged_classes,
+            "conflict_count": len(self.conflicts),
+            "conflicts_by_room": dict(sorted(by_room.items(), key=lambda item: -item[1])),
+            "conflicts": [
+                {**conflict, "first": conflict["first"].to_dict(), "second": conflict["second"].to_dict()}
+                for conflict in self.conflicts
+            ],
+        }
+
+    def save_report(self, file_path: str) -> None:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        print(f"冲突报告已保存到 {file_path}")
+
+    def print_report(self, limit: Optional[int] = 3) -> None:
+        print(f"检查记录 {self.checked} 条（跳过非教室/未知地点 {self.skipped} 条），合班重叠 {self.merged_classes} 次")
+        if self.conflicts:
+            print(f"发现 {len(self.conflicts)} 个时间地点冲突:")
+            for conflict in self.conflicts[:limit]:
+                first, second = conflict["first"], conflict["second"]
+                print(f"冲突地点: {conflict['room']}")
+                print(f"冲突时间: {conflict['weekDay']} {conflict['section']}节 第{conflict['weeks']}周")
+                print(f"现有课程: {first.course_name} {first.class_name} ({first.weeks})")
+                print(f"新课程: {second.course_name} {second.class_name} ({second.weeks})")
+                print("-" * 50)
+        else:
+            print("未发现时间地点冲突")
+
+
+def verify() -> bool:
+    """教室键自检：不同教室不能合并，同一教室的不同写法必须合并"""
+    detector = ConflictDetector()
+    cases = [
+        ("26号楼103", "26号楼201", False),
+        ("T107", "T108", False),
+        ("7B101", "7B102", False),
+        ("7B101", "7号楼B101", True),
+        ("7号楼A101", "7A101", True),
+    ]
+    ok = True
+    for first, second, same in cases:
+        first_key, second_key = detector._room_key(first), detector._room_key(second)
+        if first_key is None or second_key is None or (first_key == second_key) != same:
+            print(f"校验失败: {first} -> {first_key}, {second} -> {second_key}，应{'相同' if same else '不同'}")
+            ok = False
+    if ok:
+        print("校验通过: 教室键区分不同教室")
+    return ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--verify"]:
+        sys.exit(0 if verify() else 1)
+    elif len(sys.argv) == 2:
+        from CourseRecord import CourseRecord
+        import serialization
+
+        detector = ConflictDetector()
+        detector.detect(CourseRecord.from_dict(entry) for entry in serialization.load_file(sys.argv[1]))
+        detector.print_report(limit=None)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,224 @@
+"""
+课表记录的类型化表示
+
+星期、节次以小整数保存，周次在构建时一次性解析为位掩码（第 n 周对应第 n 位），
+后续处理阶段不再重复解析字符串。构建记录的同时由 ValidationReport 完成校验统计，
+不需要再对结果做额外的校验遍历。
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+WEEKDAYS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+SECTIONS = ["0102", "0304", "0506", "0708", "0910", "1112"]
+
+# 星期名称 -> 1~7，节次 -> SECTIONS 下标
+WEEKDAY_INDEX = {name: i + 1 for i, name in enumerate(WEEKDAYS)}
+SECTION_INDEX = {name: i for i, name in enumerate(SECTIONS)}
+
+UNKNOWN_WEEKS = "未知周次"
+UNKNOWN_LOCATION = "未知地点"
+
+REQUIRED_FIELDS = ("classRoom", "weeks", "weekDay", "section")
+
+_WEEK_FORMAT = re.compile(r".*周$")
+_LOCATION_FORMAT = re.compile(r".*[a-zA-Z0-9].{1,}")
+
+
+@lru_cache(maxsize=4096)
+def parse_week_mask(weeks_str: str) -> Tuple[int, int]:
+    """
+    解析周次字符串为位掩码，规则与 ClassScheduleProcessor.parse_weeks 一致
+    返回 (掩码, 解析失败的片段数)
+    """
+    cleaned = re.sub(r'[()周]', '', weeks_str)
+    cleaned = cleaned.replace("单周", "").replace("双周", "")
+    periods = re.split(r'[,，]', cleaned)
+
+    mask = 0
+    errors = 0
+    for period in periods:
+        period = period.strip()
+        if not period:
+            continue
+        if '-' in period:
+            try:
+                start, end = map(int, period.split('-'))
+            except ValueError:
+                errors += 1
+                continue
+            if end >= start:
+                mask |= ((1 << (end - start + 1)) - 1) << start
+        elif period.isdigit():
+            mask |= 1 << int(period)
+        elif '单' in period or '双' in period:
+            try:
+                mask |= 1 << int(re.sub(r'[单双]', '', period))
+            except ValueError:
+                errors += 1
+        else:
+            errors += 1
+    return mask, errors
+
+
+def mask_to_weeks(mask: int) -> List[int]:
+    """位掩码转回升序周次列表"""
+    weeks = []
+    week = 0
+    while mask:
+        if mask & 1:
+            weeks.append(week)
+        mask >>= 1
+        week += 1
+    return weeks
+
+
+class CourseRecord:
+    __slots__ = ("weekday", "section", "course_name", "class_name", "weeks", "class_room",
+                 "week_mask", "week_errors")
+
+    def __init__(self, weekday: int, section: int, course_name: str, class_name: str,
+                 weeks: str, class_room: str):
+        self.weekday = weekday  # 1~7，无法识别时为 0
+        self.section = section  # SECTIONS 下标，无法识别时为 -1
+        self.course_name = course_name
+        self.class_name = class_name
+        self.weeks = weeks  # 原始周次字符串
+        self.class_room = class_room  # 原始地点字符串
+        self.week_mask, self.week_errors = parse_week_mask(weeks)
+
+    @classmethod
+    def from_dict(cls, entry: Dict) -> "CourseRecord":
+        """从 tableInfo.json 的一条记录构建"""
+        return cls(
+            WEEKDAY_INDEX.get(entry["weekDay"], 0),
+            SECTION_INDEX.get(entry["section"], -1),
+            entry.get("courseName", ""),
+            entry.get("className", ""),
+            entry["weeks"],
+            entry["classRoom"],
+        )
+
+    @property
+    def weekday_name(self) -> str:
+        return WEEKDAYS[self.weekday - 1] if self.weekday else ""
+
+    @property
+    def section_name(self) -> str:
+        return SECTIONS[self.section] if self.section >= 0 else ""
+
+    @property
+    def week_list(self) -> List[int]:
+        return mask_to_weeks(self.week_mask)
+
+    def to_dict(self) -> Dict:
+        """输出为 tableInfo.json 的记录格式"""
+        return {
+            "weekDay": self.weekday_name,
+            "section": self.section_name,
+            "courseName": self.course_name,
+            "className": self.class_name,
+            "weeks": self.weeks,
+            "classRoom": self.class_room,
+        }
+
+    def __repr__(self):
+        return (f"CourseRecord(weekDay={self.weekday_name}, section={self.section_name}, "
+                f"courseName={self.course_name}, weeks={self.weeks}, classRoom={self.class_room})")
+
+
+class ValidationReport:
+    """构建记录时逐条累计的校验结果（缺失字段、格式）；时间地点冲突见 ConflictDetector"""
+
+    def __init__(self):
+        self.total = 0
+        self.success = 0
+        self.missing_weeks = 0
+        self.missing_location = 0
+        self.problems = []  # [(问题类型, 记录)]
+
+        self.format_valid = 0
+        self.invalid_records = []  # [{"record", "weeks_valid", "location_valid"}]
+
+    @classmethod
+    def from_records(cls, records) -> "ValidationReport":
+        report = cls()
+        for record in records:
+            report.add(record)
+        return report
+
+    def add(self, record: CourseRecord) -> None:
+        self.total += 1
+        weeks, location = record.weeks, record.class_room
+
+        # 缺失周次/地点
+        week_issue = weeks in (UNKNOWN_WEEKS, "")
+        location_issue = location in (UNKNOWN_LOCATION, "")
+        if week_issue and location_issue:
+            self.missing_weeks += 1
+            self.missing_location += 1
+            self.problems.append(("both", record))
+        elif week_issue:
+            self.missing_weeks += 1
+            self.problems.append(("weeks", record))
+        elif location_issue:
+            self.missing_location += 1
+            self.problems.append(("location", record))
+        else:
+            self.success += 1
+
+        # 格式
+        weeks_valid = bool(_WEEK_FORMAT.match(weeks)) if weeks else False
+        location_valid = bool(_LOCATION_FORMAT.match(location)) if location else False
+        if weeks_valid and location_valid:
+            self.format_valid += 1
+        else:
+            self.invalid_records.append({
+                "record": record,
+                "weeks_valid": weeks_valid,
+                "location_valid": location_valid
+            })
+
+    # ------------------ 输出 ------------------
+    def print_parsing_report(self, problems_file: Optional[str] = "parsing_problems.json") -> None:
+        success_rate = (self.success / self.total) * 100 if self.total > 0 else 0
+
+        print("=" * 50)
+        print("解析结果验证报告")
+        print("=" * 50)
+        print(f"总记录数: {self.total}")
+        print(f"成功解析: {self.success} ({success_rate:.2f}%)")
+        print(f"缺失周次: {self.missing_weeks}")
+        print(f"缺失地点: {self.missing_location}")
+        print("-" * 50)
+
+        if self.problems:
+            print("问题记录示例:")
+            for issue_type, record in self.problems[:3]:
+                print(f"类型: {issue_type}")
+                print(f"解析结果: 周次={record.weeks}, 地点={record.class_room}")
+                print("-" * 50)
+
+            if problems_file:
+                with open(problems_file, "w", encoding="utf-8") as f:
+                    json.dump([(t, r.to_dict()) for t, r in self.problems], f, ensure_ascii=False, indent=2)
+                print(f"完整问题记录已保存至: {problems_file}")
+        else:
+            print("所有记录解析成功!")
+
+    def print_pattern_report(self) -> None:
+        print(f"格式验证结果: {self.format_valid}/{self.total} 条记录符合格式要求")
+
+        if self.invalid_records:
+            print("问题记录示例:")
+            for record_info in self.invalid_records[:3]:
+                rec = record_info["record"]
+                print(f"课程: {rec.course_name}")
+                print(f"周次: {rec.weeks} ({'有效' if record_info['weeks_valid'] else '无效'})")
+                print(f"地点: {rec.class_room} ({'有效' if record_info['location_valid'] else '无效'})")
+                print("-" * 50)
+
+    def print_all(self) -> None:
+        self.print_parsing_report()
+        self.print_pattern_report()
@@ -1,8 +1,9 @@
-import json
 import re
-from bs4 import BeautifulSoup
 from typing import List, Dict, Tuple
 
+import serialization
+from ConflictDetector import ConflictDetector
+from CourseRecord import CourseRecord, ValidationReport, UNKNOWN_WEEKS, UNKNOWN_LOCATION
 from utils import save_json_to_file
 
 
@@ -15,6 +16,9 @@ class CourseTableParser:
         """
         self.html_file = html_file
         self.output_file = output_file
+        # run() 之后保存本次解析的记录与校验报告
+        self.records = None
+        self.report = None
 
     @staticmethod
     def parse_weeks_and_location(lines: List[str]) -> List[Tuple[str, str]]:
@@ -71,7 +75,14 @@ class CourseTableParser:
 
         return results
 
-    def parse_course_table_from_html2(self) -> List[Dict]:
+    def parse_records(self) -> Tuple[List[CourseRecord], ValidationReport]:
+        """
+        解析课表 HTML 为 CourseRecord 列表，构建记录的同时完成校验统计
+        返回 (记录列表, 校验报告)
+        """
+        # bs4 导入较慢，只在解析时导入
+        from bs4 import BeautifulSoup
+
         with open(self.html_file, "r", encoding="utf-8") as f:
             html_content = f.read()
 
@@ -82,17 +93,20 @@ class CourseTableParser:
 
         rows = table.find_all("tr")[2:]
 
-        weekdays = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
-        sections = ["0102", "0304", "0506", "0708", "0910", "1112"]
+        records = []
+        report = ValidationReport()
 
-        results = []
+        def add(weekday, section, course_name, class_name, weeks, location):
+            record = CourseRecord(weekday, section, course_name, class_name, weeks, location)
+            report.add(record)
+            records.append(record)
 
         for row in rows:
             cells = row.find_all("td")
             for index, cell in enumerate(cells[1:-1]):
                 if cell.text.strip() == "":
                     continue
-                weekday_index = index // 6
+                weekday = index // 6 + 1
                 section_index = index % 6
 
                 divs = BeautifulSoup(cell.decode_contents(), "html.parser").find_all(
@@ -113,144 +127,41 @@ class CourseTableParser:
                         week_location_pairs = self.parse_weeks_and_location(lines)
 
                     for weeks, location in week_location_pairs:
-                        results.append({
-                            "weekDay": weekdays[weekday_index],
-                            "section": sections[section_index],
-                            "courseName": course_name,
-                            "className": class_name,
-                            "weeks": weeks,
-                            "classRoom": location
-                        })
+                        add(weekday, section_index, course_name, class_name, weeks, location)
 
                     if not week_location_pairs:
-                        results.append({
-                            "weekDay": weekdays[weekday_index],
-                            "section": sections[section_index],
-                            "courseName": course_name,
-                            "className": class_name,
-                            "weeks": "未知周次",
-                            "classRoom": "未知地点"
-                        })
+                        add(weekday, section_index, course_name, class_name, UNKNOWN_WEEKS, UNKNOWN_LOCATION)
 
-        return results
+        return records, report
 
+    def parse_course_table_from_html2(self) -> List[Dict]:
+        records, _ = self.parse_records()
+        return [record.to_dict() for record in records]
+
+    # 以下校验方法保留给单独检查 tableInfo.json 使用；解析流程中的校验已在 parse_records 里一次完成
     @staticmethod
     def validate_parsing_results(results: List[Dict]) -> None:
-        status_counts = {"success": 0, "missing_weeks": 0, "missing_location": 0}
-        problems = []
-
-        for record in results:
-            week_issue = record["weeks"] in ["未知周次", ""]
-            location_issue = record["classRoom"] in ["未知地点", ""]
-
-            if week_issue and location_issue:
-                status_counts["missing_weeks"] += 1
-                status_counts["missing_location"] += 1
-                problems.append(("both", record))
-            elif week_issue:
-                status_counts["missing_weeks"] += 1
-                problems.append(("weeks", record))
-            elif location_issue:
-                status_counts["missing_location"] += 1
-                problems.append(("location", record))
-            else:
-                status_counts["success"] += 1
-
-        total = len(results)
-        success_rate = (status_counts["success"] / total) * 100 if total > 0 else 0
-
-        print("=" * 50)
-        print("解析结果验证报告")
-        print("=" * 50)
-        print(f"总记录数: {total}")
-        print(f"成功解析: {status_counts['success']} ({success_rate:.2f}%)")
-        print(f"缺失周次: {status_counts['missing_weeks']}")
-        print(f"缺失地点: {status_counts['missing_location']}")
-        print("-" * 50)
-
-        if problems:
-            print("问题记录示例:")
-            for issue_type, record in problems[:3]:
-                print(f"类型: {issue_type}")
-                print(f"解析结果: 周次={record['weeks']}, 地点={record['classRoom']}")
-                print("-" * 50)
-
-            with open("parsing_problems.json", "w", encoding="utf-8") as f:
-                json.dump(problems, f, ensure_ascii=False, indent=2)
-            print("完整问题记录已保存至: parsing_problems.json")
-        else:
-            print("所有记录解析成功!")
+        ValidationReport.from_records(map(CourseRecord.from_dict, results)).print_parsing_report()
 
     @staticmethod
     def validate_with_patterns(results: List[Dict]):
-        week_pattern = re.compile(r".*周$")
-        location_pattern = re.compile(r".*[a-zA-Z0-9].{1,}")
-
-        valid_count = 0
-        invalid_records = []
-
-        for record in results:
-            weeks_valid = bool(week_pattern.match(record["weeks"])) if record["weeks"] else False
-            location_valid = bool(location_pattern.match(record["classRoom"])) if record["classRoom"] else False
-
-            if weeks_valid and location_valid:
-                valid_count += 1
-            else:
-                invalid_records.append({
-                    "record": record,
-                    "weeks_valid": weeks_valid,
-                    "location_valid": location_valid
-                })
-
-        print(f"格式验证结果: {valid_count}/{len(results)} 条记录符合格式要求")
-
-        if invalid_records:
-            print("问题记录示例:")
-            for record_info in invalid_records[:3]:
-                rec = record_info["record"]
-                print(f"课程: {rec['courseName']}")
-                print(f"周次: {rec['weeks']} ({'有效' if record_info['weeks_valid'] else '无效'})")
-                print(f"地点: {rec['classRoom']} ({'有效' if record_info['location_valid'] else '无效'})")
-                print("-" * 50)
+        ValidationReport.from_records(map(CourseRecord.from_dict, results)).print_pattern_report()
 
     @staticmethod
     def check_data_consistency(results: List[Dict]):
-        time_location_map = {}
-        conflicts = []
-
-        for record in results:
-            key = (record["weekDay"], record["section"], record["classRoom"])
-            if record["classRoom"] in ["未知地点", ""]:
-                continue
-
-            if key in time_location_map:
-                existing_weeks = time_location_map[key]["weeks"]
-                new_weeks = record["weeks"]
-
-                if existing_weeks == new_weeks:
-                    conflicts.append({
-                        "location": key[2],
-                        "time": f"{key[0]} {key[1]}节",
-                        "existing": time_location_map[key],
-                        "new": record
-                    })
-            else:
-                time_location_map[key] = record
-
-        if conflicts:
-            print(f"发现 {len(conflicts)} 个潜在时间冲突:")
-            for conflict in conflicts[:3]:
-                print(f"冲突地点: {conflict['location']}")
-                print(f"冲突时间: {conflict['time']}")
-                print(f"现有课程: {conflict['existing']['courseName']} ({conflict['existing']['weeks']}周)")
-                print(f"新课程: {conflict['new']['courseName']} ({conflict['new']['weeks']}周)")
-                print("-" * 50)
-        else:
-            print("未发现时间地点冲突")
-
-    def run(self):
-        res = self.parse_course_table_from_html2()
-        json_str = json.dumps(res, ensure_ascii=False, indent=2)
-        save_json_to_file(json_str, self.output_file)
+        detector = ConflictDetector()
+        detector.detect(map(CourseRecord.from_dict, results))
+        detector.print_report()
+        return detector
+
+    def run(self, verbose: bool = False):
+        records, report = self.parse_records()
+        res = [record.to_dict() for record in records]
+        save_json_to_file(serialization.dumps(res), self.output_file)
+
+        if verbose:
+            report.print_all()
+        self.records = records
+        self.report = report
 
         return res
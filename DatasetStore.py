@@ -0,0 +1,221 @@
+"""
+版本化数据集存储
+
+每次发布先写入临时目录并 fsync，再原子重命名为 versions/<版本号>/，
+最后原子替换 CURRENT 指针文件。读取方只跟随 CURRENT，不会读到写了一半的文件，
+也不会出现数据集暂时不存在的情况；回滚只需改写指针。
+
+目录结构:
+    datasets/
+    ├── CURRENT                      # 当前版本号
+    └── versions/
+        ├── 20250910_092440_1a2b3c4d/total_schedule.json
+        │                           /total_schedule.packed   # 紧凑快照（见 PackedSchedule）
+        └── ...
+
+命令行:
+    python DatasetStore.py list
+    python DatasetStore.py publish total_schedule.json
+    python DatasetStore.py rollback [版本号]     # 不指定时回滚到上一个版本
+（backend=sqlite 时 API 查询 sqlitePath 数据库，命令行发布和回滚会同时把该版本写入数据库）
+    python DatasetStore.py prune [保留数量]
+"""
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+import settings
+from PackedSchedule import PackedSchedule
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+
+def _fsync_dir(path):
+    """目录 fsync，保证重命名落盘（Windows 不支持，跳过）"""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(file_path, data):
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    _fsync_dir(os.path.dirname(os.path.abspath(file_path)))
+
+
+class DatasetStore:
+    def __init__(self, root=None, file_name=None, keep=None):
+        """
+        :param root: 数据集根目录，默认读取 config.ini [dataset] dir
+        :param file_name: 每个版本内的数据文件名
+        :param keep: 保留的版本数量，发布后自动清理更早的版本
+        """
+        self.root = root or settings.get_str("dataset", "dir", fallback="datasets")
+        self.file_name = file_name or settings.get_str("fileName", "scheduleInfoSaveTo",
+                                                       fallback="total_schedule.json")
+        self.keep = keep if keep is not None else settings.get_int("dataset", "keep", fallback=5)
+        # 发布时同时生成紧凑快照，API 启动时无需解析完整 JSON
+        self.snapshot = settings.get_bool("dataset", "snapshot", fallback=True)
+        # backend=sqlite 时 API 直接查询该数据库，切换版本时需同步写入
+        self.sqlite_file = None
+        if settings.get_str("dataset", "backend", fallback="json") == "sqlite":
+            self.sqlite_file = settings.get_str("dataset", "sqlitePath", fallback="total_schedule.db")
+        self.versions_dir = os.path.join(self.root, VERSIONS_DIR)
+        self.current_file = os.path.join(self.root, CURRENT_FILE)
+
+        # CURRENT 指针缓存，指针文件未变化时不重复读取
+        self._pointer_stamp = None
+        self._pointer_version = None
+        self._lock = threading.Lock()
+
+    # ------------------ 读取 ------------------
+    def current(self):
+        """当前版本号，未发布过时返回 None"""
+        try:
+            stat = os.stat(self.current_file)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._pointer_stamp:
+            with self._lock:
+                with open(self.current_file, "r", encoding="utf-8") as f:
+                    version = f.read().strip() or None
+                self._pointer_version = version
+                self._pointer_stamp = stamp
+        return self._pointer_version
+
+    def path_of(self, version):
+        return os.path.join(self.versions_dir, version, self.file_name)
+
+    def current_path(self):
+        """当前版本数据文件路径，未发布过时返回 None"""
+        version = self.current()
+        return self.path_of(version) if version else None
+
+    def versions(self):
+        """所有版本号，按发布时间升序"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir)
+                      if os.path.isfile(self.path_of(v)))
+
+    # ------------------ 发布 ------------------
+    def publish(self, source_path):
+        """发布新版本并切换为当前版本，返回版本号"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+        tmp_dir = os.path.join(self.root, f".tmp_{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            tmp_file = os.path.join(tmp_dir, self.file_name)
+            digest = hashlib.sha256()
+            with open(source_path, "rb") as src, open(tmp_file, "wb") as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            if self.snapshot:
+                try:
+                    PackedSchedule.build(tmp_file)
+                except Exception as e:
+                    # 快照只用于加速启动，生成失败时 API 回退为解析 JSON
+                    print(f"生成数据集快照失败: {str(e)}")
+            _fsync_dir(tmp_dir)
+
+            version = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{digest.hexdigest()[:8]}"
+            target_dir = os.path.join(self.versions_dir, version)
+            if os.path.exists(target_dir):
+                # 同一秒内重复发布相同内容
+                shutil.rmtree(tmp_dir)
+            else:
+                os.replace(tmp_dir, target_dir)
+                _fsync_dir(self.versions_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.set_current(version)
+        print(f"数据集已发布为版本 {version}")
+        self.prune()
+        return version
+
+    def set_current(self, version):
+        if not os.path.isfile(self.path_of(version)):
+            raise ValueError(f"数据集版本不存在: {version}")
+        _write_atomic(self.current_file, version.encode("utf-8"))
+
+    def rollback(self, version=None):
+        """回滚到指定版本，不指定时回滚到当前版本的上一个版本，返回回滚后的版本号"""
+        if version is None:
+            versions = self.versions()
+            current = self.current()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ValueError("没有可回滚的更早版本")
+            version = older[-1]
+        self.set_current(version)
+        self.sync_sqlite(version)
+        print(f"数据集已回滚到版本 {version}")
+        return version
+
+    def sync_sqlite(self, version):
+        """backend=sqlite 时把指定版本写入 API 查询的数据库（单个事务，写入期间 API 仍读取旧数据）"""
+        if not self.sqlite_file:
+            return
+        from SqliteStore import SqliteStore
+        count = SqliteStore(self.sqlite_file).import_json(self.path_of(version))
+        print(f"已将版本 {version} 的 {count} 个教室写入 {self.sqlite_file}")
+
+    def prune(self, keep=None):
+        """只保留最新的 keep 个版本（当前版本始终保留），返回删除的版本号"""
+        keep = self.keep if keep is None else keep
+        if keep is None or keep <= 0:
+            return []
+        current = self.current()
+        versions = self.versions()
+        removed = []
+        for version in versions[:-keep] if len(versions) > keep else []:
+            if version == current:
+                continue
+            shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+            removed.append(version)
+        if removed:
+            print(f"已清理旧数据集版本: {', '.join(removed)}")
+        return removed
+
+
+def main(argv):
+    store = DatasetStore()
+    command = argv[0] if argv else "list"
+    if command == "list":
+        current = store.current()
+        for version in store.versions():
+            print(f"{'*' if version == current else ' '} {version}")
+    elif command == "publish" and len(argv) > 1:
+        store.sync_sqlite(store.publish(argv[1]))
+    elif command == "rollback":
+        store.rollback(argv[1] if len(argv) > 1 else None)
+    elif command == "prune":
+        store.prune(int(argv[1]) if len(argv) > 1 else None)
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,145 @@
+"""
+紧凑的空闲时间快照
+
+发布数据集时把 total_schedule.json 预先打包：只保留教室（is_class_room），
+每间教室每个节次、每个星期用一个整数位掩码记录空闲的周次（第 n 周对应第 n 位）。
+API 启动时直接读取快照，无需解析完整 JSON，查询结果与
+searchFreeRoomApi.find_free_classrooms 一致。
+
+快照记录了对应数据文件的大小和修改时间，数据文件变化后快照自动失效。
+
+命令行（为已有的数据文件生成快照）:
+    python PackedSchedule.py build total_schedule.json
+"""
+import os
+import pickle
+import sys
+import uuid
+
+import serialization
+
+# 快照格式版本，结构变化时递增，旧快照自动失效
+FORMAT_VERSION = 1
+
+
+def snapshot_path_for(data_path):
+    """数据文件对应的快照路径，例如 total_schedule.json -> total_schedule.packed"""
+    return os.path.splitext(data_path)[0] + ".packed"
+
+
+def _source_stamp(data_path):
+    stat = os.stat(data_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PackedSchedule:
+    __slots__ = ("total", "rooms")
+
+    def __init__(self, total, rooms):
+        self.total = total  # 数据文件中的教室总数（含非教室）
+        # [(building, floor, room_id, {节次: {星期: 空闲周次掩码}})]
+        self.rooms = rooms
+
+    def __len__(self):
+        return self.total
+
+    @classmethod
+    def from_rooms(cls, data):
+        """由 total_schedule.json 格式的教室列表构建"""
+        rooms = []
+        for room in data:
+            if not room.get("is_class_room", False):
+                continue
+            sections = {}
+            for time_slot in room["free_time"]:
+                # 同一节次/周次/星期重复出现时以第一次为准，与逐条查找的结果一致
+                free, seen = sections.setdefault(time_slot["section"], ({}, {}))
+                for week_schedule in time_slot["weeks"]:
+                    week, week_day = week_schedule["week"], week_schedule["weekDay"]
+                    if not isinstance(week, int) or week < 0:
+                        continue
+                    bit = 1 << week
+                    if seen.get(week_day, 0) & bit:
+                        continue
+                    seen[week_day] = seen.get(week_day, 0) | bit
+                    if week_schedule["isFree"]:
+                        free[week_day] = free.get(week_day, 0) | bit
+            rooms.append((room["building"], room["floor"], room["room_id"],
+                          {section: free for section, (free, _) in sections.items()}))
+        return cls(len(data), rooms)
+
+    # ------------------ 读写 ------------------
+    def save(self, path, source_path):
+        """原子写入快照，source_path 为对应的数据文件"""
+        payload = {
+            "format": FORMAT_VERSION,
+            "source": _source_stamp(source_path),
+            "total": self.total,
+            "rooms": self.rooms,
+        }
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, source_path):
+        """读取快照，格式版本不符或数据文件已变化时返回 None"""
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("format") != FORMAT_VERSION or tuple(payload.get("source", ())) != _source_stamp(source_path):
+            return None
+        return cls(payload["total"], payload["rooms"])
+
+    @classmethod
+    def build(cls, data_path):
+        """为数据文件生成快照，返回快照路径"""
+        return cls.from_rooms(serialization.load_file(data_path)).save(snapshot_path_for(data_path), data_path)
+
+    # ------------------ 查询 ------------------
+    def find_free_classrooms(self, week, week_day, section, section_order, building=None, floor=None):
+        """与 searchFreeRoomApi.find_free_classrooms 结果一致"""
+        try:
+            start_index = section_order.index(section)
+        except ValueError:
+            return []
+        sections = section_order[start_index:]
+        if not isinstance(week, int) or week < 0:
+            return []
+        bit = 1 << week
+
+        free_rooms = []
+        for room_building, room_floor, room_id, free in self.rooms:
+            if building and room_building != building:
+                continue
+            if floor and room_floor != floor:
+                continue
+
+            free_sections = []
+            for current_section in sections:
+                masks = free.get(current_section)
+                if masks is not None and masks.get(week_day, 0) & bit:
+                    free_sections.append(current_section)
+                else:
+                    break
+
+            if free_sections:
+                free_rooms.append({
+                    'building': room_building,
+                    'floor': room_floor,
+                    'room_id': room_id,
+                    'max_continuous': len(free_sections),
+                    'free_sections': free_sections
+                })
+        return free_rooms
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "build":
+        print(f"已生成快照 {PackedSchedule.build(sys.argv[2])}")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -1,7 +1,11 @@
 import json
 import re
+import time
 from collections import defaultdict
-import openpyxl
+from contextlib import nullcontext
+
+import serialization
+from CourseRecord import CourseRecord, REQUIRED_FIELDS, parse_week_mask, mask_to_weeks
 
 # 星期映射表
 WEEKDAY_MAPPING = {
@@ -16,13 +20,71 @@ WEEKDAY_MAPPING = {
 REVERSE_WEEKDAY_MAPPING = {v: k for k, v in WEEKDAY_MAPPING.items()}
 
 
+def normalize_classroom_name(classroom_str, exact=False):
+    """
+    标准化教室名称，无法识别时返回 None
+    :param exact: 要求整个字符串匹配；默认只匹配开头，与教室表的匹配规则一致，
+                  但可能丢失信息（如 26号楼103 会被识别为 2号楼 6 号教室）
+    """
+    if "校内" in classroom_str or "实验" in classroom_str or "琴房" in classroom_str:
+        return None
+
+    patterns = [
+        r'(\d+)号楼([A-Za-z])(\d+)',
+        r'(\d+)号楼([A-Za-z])区(\d+)',
+        r'(\d+)([A-Za-z])?(\d+)',
+        r'([A-Za-z]?\d+[A-Za-z]?\d+)',
+        r'(\d+)([A-Za-z])(\d+)',
+        r'([A-Za-z]?\d+)楼?([A-Za-z]?)(\d+)',
+    ]
+
+    for pattern in patterns:
+        match = re.fullmatch(pattern, classroom_str) if exact else re.match(pattern, classroom_str)
+        if match:
+            groups = match.groups()
+            building_num = groups[0]
+            zone = groups[1] if len(groups) > 1 and groups[1] else ""
+            room_id = groups[2] if len(groups) > 2 else groups[1] if len(groups) > 1 else ""
+
+            if zone:
+                building = f"{building_num}号楼{zone.upper()}区"
+            else:
+                building = f"{building_num}号楼"
+
+            if room_id:
+                floor_num = room_id[0]
+                floor_mapping = {
+                    "1": "一楼", "2": "二楼", "3": "三楼", "4": "四楼",
+                    "5": "五楼", "6": "六楼", "7": "七楼", "8": "八楼",
+                    "9": "九楼", "0": "一楼"
+                }
+                floor = floor_mapping.get(floor_num, f"{floor_num}楼")
+            else:
+                floor = "一楼"
+
+            return {
+                "building": building,
+                "floor": floor,
+                "room_id": int(room_id) if room_id and room_id.isdigit() else 0
+            }
+
+    return None
+
+
 class ClassScheduleProcessor:
-    def __init__(self, room_base_file, schedule_file, output_file, debug_excel="process_log.xlsx"):
+    def __init__(self, room_base_file, schedule_file, output_file, debug_excel="process_log.xlsx", profiler=None,
+                 sqlite_file=None, records=None):
         # 文件路径
         self.room_base_file = room_base_file
         self.schedule_file = schedule_file
+        # 已解码的课表记录（CourseTableParser.records），为空时从 schedule_file 读取
+        self.records = records
         self.output_file = output_file
         self.debug_excel = debug_excel
+        # 可选的 StageProfiler，用于记录各阶段耗时
+        self.profiler = profiler
+        # 不为空时结果同时批量写入该 SQLite 数据库
+        self.sqlite_file = sqlite_file
 
         # 计数器
         self.normalize_failed_counter = 0
@@ -37,83 +99,16 @@ class ClassScheduleProcessor:
     # ------------------ 工具方法 ------------------
     def parse_weeks(self, weeks_str):
         """解析周次字符串，返回周次列表"""
-        cleaned = re.sub(r'[()周]', '', weeks_str)
-        cleaned = cleaned.replace("单周", "").replace("双周", "")
-        periods = re.split(r'[,，]', cleaned)
-
-        week_list = []
-        for period in periods:
-            period = period.strip()
-            if not period:
-                continue
-            if '-' in period:
-                try:
-                    start, end = map(int, period.split('-'))
-                    week_list.extend(range(start, end + 1))
-                except:
-                    self.weeks_parse_failed_counter += 1
-                    continue
-            elif period.isdigit():
-                week_list.append(int(period))
-            elif '单' in period or '双' in period:
-                try:
-                    week_num = int(re.sub(r'[单双]', '', period))
-                    week_list.append(week_num)
-                except:
-                    self.weeks_parse_failed_counter += 1
-                    continue
-            else:
-                self.weeks_parse_failed_counter += 1
-                continue
-        return sorted(set(week_list))
+        week_mask, errors = parse_week_mask(weeks_str)
+        self.weeks_parse_failed_counter += errors
+        return mask_to_weeks(week_mask)
 
     def normalize_classroom(self, classroom_str):
         """标准化教室名称"""
-        if "校内" in classroom_str or "实验" in classroom_str or "琴房" in classroom_str:
+        room_info = normalize_classroom_name(classroom_str)
+        if room_info is None:
             self.normalize_failed_counter += 1
-            return None
-
-        patterns = [
-            r'(\d+)号楼([A-Za-z])(\d+)',
-            r'(\d+)号楼([A-Za-z])区(\d+)',
-            r'(\d+)([A-Za-z])?(\d+)',
-            r'([A-Za-z]?\d+[A-Za-z]?\d+)',
-            r'(\d+)([A-Za-z])(\d+)',
-            r'([A-Za-z]?\d+)楼?([A-Za-z]?)(\d+)',
-        ]
-
-        for pattern in patterns:
-            match = re.match(pattern, classroom_str)
-            if match:
-                groups = match.groups()
-                building_num = groups[0]
-                zone = groups[1] if len(groups) > 1 and groups[1] else ""
-                room_id = groups[2] if len(groups) > 2 else groups[1] if len(groups) > 1 else ""
-
-                if zone:
-                    building = f"{building_num}号楼{zone.upper()}区"
-                else:
-                    building = f"{building_num}号楼"
-
-                if room_id:
-                    floor_num = room_id[0]
-                    floor_mapping = {
-                        "1": "一楼", "2": "二楼", "3": "三楼", "4": "四楼",
-                        "5": "五楼", "6": "六楼", "7": "七楼", "8": "八楼",
-                        "9": "九楼", "0": "一楼"
-                    }
-                    floor = floor_mapping.get(floor_num, f"{floor_num}楼")
-                else:
-                    floor = "一楼"
-
-                return {
-                    "building": building,
-                    "floor": floor,
-                    "room_id": int(room_id) if room_id and room_id.isdigit() else 0
-                }
-
-        self.normalize_failed_counter += 1
-        return None
+        return room_info
 
     # ------------------ ClassRoom 内部类 ------------------
     class ClassRoom:
@@ -140,6 +135,17 @@ class ClassScheduleProcessor:
                         if week_day_num in self.schedule[section][week]:
                             self.schedule[section][week][week_day_num] = False
 
+        def mark_occupied_mask(self, week_day_num, section, week_mask):
+            """按周次位掩码标记占用，week_day_num 为 1~7"""
+            section_data = self.schedule.get(section)
+            if section_data is None:
+                return
+            for week in range(1, 19):
+                if week_mask >> week & 1:
+                    day_data = section_data[week]
+                    if week_day_num in day_data:
+                        day_data[week_day_num] = False
+
         def to_free_time(self):
             free_time = []
             for section, week_data in self.schedule.items():
@@ -165,11 +171,16 @@ class ClassScheduleProcessor:
             }
 
     # ------------------ 主处理流程 ------------------
+    def _stage(self, name):
+        """有 profiler 时记录阶段，否则返回空上下文"""
+        if self.profiler is None:
+            return nullcontext({})
+        return self.profiler.stage(name)
+
     def load_classrooms(self):
         """加载roomBase.json"""
         try:
-            with open(self.room_base_file, "r", encoding="utf-8") as f:
-                room_data = json.load(f)
+            room_data = serialization.load_file(self.room_base_file)
 
             for room in room_data:
                 room_id = int(room["room_id"]) if isinstance(room["room_id"], str) and room["room_id"].isdigit() else room["room_id"]
@@ -182,29 +193,50 @@ class ClassScheduleProcessor:
         except Exception as e:
             print(f"加载教室数据失败: {str(e)}")
 
+    def load_records(self):
+        """课表记录：优先使用传入的已解码记录，否则读取 schedule_file（缺少必要字段的条目保留原字典）"""
+        if self.records is not None:
+            return self.records
+        return [CourseRecord.from_dict(entry) if all(field in entry for field in REQUIRED_FIELDS) else entry
+                for entry in serialization.load_file(self.schedule_file)]
+
     def process_schedule(self):
         """处理课表数据，更新教室占用状态，并写Excel日志"""
         try:
-            with open(self.schedule_file, "r", encoding="utf-8") as f:
-                schedule_data = json.load(f)
+            schedule_data = self.load_records()
 
             total_records = len(schedule_data)
             print(f"开始处理 {total_records} 条课表记录")
 
+            # 标准化、标记占用逐条交替进行，只能累计各自耗时
+            profiling = self.profiler is not None
+            normalize_seconds = mark_seconds = 0.0
+            normalize_count = mark_count = 0
+
+            # openpyxl 导入较慢，只在写处理日志时导入
+            import openpyxl
+
             wb = openpyxl.Workbook()
             ws = wb.active
             ws.title = "处理日志"
             ws.append(["序号", "weekDay", "section", "courseName", "className", "weeks", "classRoom",
                        "标准化结果", "教室键", "解析周次", "处理结果"])
 
-            for i, entry in enumerate(schedule_data):
+            for i, record in enumerate(schedule_data):
                 result_msg, room_info_str, room_key_str, weeks_list_str = "", "", "", ""
 
-                if "classRoom" not in entry or "weeks" not in entry or "weekDay" not in entry or "section" not in entry:
+                if not isinstance(record, CourseRecord):
+                    entry = record
                     result_msg = "❌ 缺少必要字段"
                     self.failed_examples.append({"reason": "缺少必要字段", "entry": entry})
                 else:
-                    room_info = self.normalize_classroom(entry["classRoom"])
+                    entry = record.to_dict()
+                    if profiling:
+                        t0 = time.perf_counter()
+                    room_info = self.normalize_classroom(record.class_room)
+                    if profiling:
+                        normalize_seconds += time.perf_counter() - t0
+                        normalize_count += 1
                     room_info_str = str(room_info)
                     if not room_info:
                         result_msg = "❌ 教室标准化失败"
@@ -217,13 +249,20 @@ class ClassScheduleProcessor:
                             self.failed_examples.append({"reason": "教室未找到", "room_key": room_key, "entry": entry})
                             self.room_not_found_counter += 1
                         else:
-                            weeks_list = self.parse_weeks(entry["weeks"])
-                            weeks_list_str = str(weeks_list)
-                            if not weeks_list:
+                            # 周次在构建记录时已解析为位掩码
+                            self.weeks_parse_failed_counter += record.week_errors
+                            weeks_list_str = str(record.week_list)
+                            if not record.week_mask:
                                 result_msg = "❌ 周次解析为空"
-                                self.failed_examples.append({"reason": "周次解析为空", "weeks": entry["weeks"], "entry": entry})
+                                self.failed_examples.append({"reason": "周次解析为空", "weeks": record.weeks, "entry": entry})
                             else:
-                                self.classrooms[room_key].mark_occupied(entry["weekDay"], entry["section"], weeks_list)
+                                if profiling:
+                                    t0 = time.perf_counter()
+                                self.classrooms[room_key].mark_occupied_mask(record.weekday, record.section_name,
+                                                                             record.week_mask)
+                                if profiling:
+                                    mark_seconds += time.perf_counter() - t0
+                                    mark_count += 1
                                 self.success_counter += 1
                                 result_msg = "✅ 已标记占用"
 
@@ -233,6 +272,10 @@ class ClassScheduleProcessor:
                     room_info_str, room_key_str, weeks_list_str, result_msg
                 ])
 
+            if profiling:
+                self.profiler.record("normalize", normalize_seconds, normalize_count)
+                self.profiler.record("mark", mark_seconds, mark_count)
+
             wb.save(self.debug_excel)
             print(f"处理日志已保存到 {self.debug_excel}")
 
@@ -245,25 +288,43 @@ class ClassScheduleProcessor:
         """保存最终结果"""
         try:
             result = [room.to_dict() for room in self.classrooms.values()]
-            with open(self.output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            serialization.dump_file(result, self.output_file)
             print(f"结果已保存到 {self.output_file}")
         except Exception as e:
             print(f"保存结果失败: {str(e)}")
 
+    def save_sqlite(self):
+        """结果批量写入 SQLite（单个事务，写入期间 API 仍读取旧数据）"""
+        try:
+            from SqliteStore import SqliteStore
+            count = SqliteStore(self.sqlite_file).write_rooms(room.to_dict() for room in self.classrooms.values())
+            print(f"已写入 {count} 个教室到 {self.sqlite_file}")
+        except Exception as e:
+            print(f"写入 SQLite 失败: {str(e)}")
+
     def run(self):
         """执行完整流程"""
         print("=" * 50)
         print("教室空闲时间计算器")
         print("=" * 50)
 
-        self.load_classrooms()
+        with self._stage("load_classrooms") as st:
+            self.load_classrooms()
+            st["records"] = len(self.classrooms)
         if not self.classrooms:
             print("错误: 未加载任何教室数据，程序终止")
             return
 
-        self.process_schedule()
-        self.save_results()
+        with self._stage("process_schedule") as st:
+            self.process_schedule()
+            st["records"] = self.success_counter
+        with self._stage("save_results") as st:
+            self.save_results()
+            st["records"] = len(self.classrooms)
+        if self.sqlite_file:
+            with self._stage("save_sqlite") as st:
+                self.save_sqlite()
+                st["records"] = len(self.classrooms)
 
         print("\n处理结果统计:")
         print(f"成功标记的占用次数: {self.success_counter}")
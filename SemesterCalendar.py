@@ -0,0 +1,192 @@
+"""
+校历与当前时段
+
+根据 config.ini [calendar] 中的开学日期和各节次上课时间，把某一时刻换算为
+(周次, 星期, 节次)。FreeNowScheduler 在后台按节次边界预先计算当前时段和下一时段的
+空闲教室，“现在有哪些空教室”的查询直接读取缓存。
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import settings
+from CourseRecord import SECTIONS, WEEKDAYS
+
+# 周次、星期（“星期一”形式，与 total_schedule.json 一致）、节次，以及该节次的起止时间
+Slot = namedtuple("Slot", ["week", "week_day", "section", "start", "end"])
+
+DEFAULT_SECTION_TIMES = {
+    "0102": "08:30-10:05",
+    "0304": "10:25-12:00",
+    "0506": "14:00-15:35",
+    "0708": "15:45-17:20",
+    "0910": "19:00-20:35",
+}
+
+
+def _parse_time_range(value):
+    start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in value.split("-"))
+    if end <= start:
+        raise ValueError(f"节次时间无效: {value}")
+    return start, end
+
+
+class SemesterCalendar:
+    def __init__(self, term_start, section_times=None, max_week=18, teaching_days=5):
+        """
+        :param term_start: 第一周周一的日期（date 或 "YYYY-MM-DD"）
+        :param section_times: {节次: "HH:MM-HH:MM"}，默认 DEFAULT_SECTION_TIMES
+        :param max_week: 最大教学周
+        :param teaching_days: 每周上课天数（从周一起），total_schedule.json 只包含星期一至星期五，
+                              其余日期不视为上课时段
+        """
+        if isinstance(term_start, str):
+            term_start = datetime.strptime(term_start, "%Y-%m-%d").date()
+        # 统一对齐到所在周的周一
+        self.term_start = term_start - timedelta(days=term_start.weekday())
+        self.max_week = max_week
+        self.teaching_days = teaching_days
+        times = section_times or DEFAULT_SECTION_TIMES
+        self.sections = sorted(
+            ((section, *_parse_time_range(value)) for section, value in times.items()),
+            key=lambda item: item[1]
+        )
+
+    @classmethod
+    def from_config(cls):
+        """读取 config.ini [calendar]，未配置开学日期时返回 None"""
+        term_start = settings.get_str("calendar", "termStart")
+        if not term_start:
+            return None
+        config = settings.get_config()
+        section_times = {section: config.get("calendar", section)
+                         for section in SECTIONS if config.has_option("calendar", section)}
+        return cls(term_start, section_times or None, settings.get_int("calendar", "maxWeek", fallback=18),
+                   settings.get_int("calendar", "teachingDays", fallback=5))
+
+    def week_of(self, day):
+        """某一天所在的教学周，不在学期内时返回 None"""
+        if isinstance(day, datetime):
+            day = day.date()
+        week = (day - self.term_start).days // 7 + 1
+        return week if 1 <= week <= self.max_week else None
+
+    def _slot(self, day, index):
+        week = self.week_of(day)
+        if week is None or day.weekday() >= self.teaching_days:
+            return None
+        section, start, end = self.sections[index]
+        return Slot(week, WEEKDAYS[day.weekday()], section,
+                    datetime.combine(day, start), datetime.combine(day, end))
+
+    def resolve(self, now=None):
+        """
+        当前时段：正在上课时为本节，课间为即将开始的下一节；
+        当天课程已结束、当天不上课（周末）或不在学期内时返回 None
+        """
+        now = now or datetime.now()
+        for index, (_, _, end) in enumerate(self.sections):
+            if now.time() < end:
+                return self._slot(now.date(), index)
+        return None
+
+    def _first_slot_after(self, day):
+        """day 之后第一个上课日的第一节，超出学期时返回 None"""
+        for offset in range(1, 8):
+            slot = self._slot(day + timedelta(days=offset), 0)
+            if slot is not None:
+                return slot
+        return None
+
+    def next_slot(self, slot):
+        """紧接其后的时段（跨天时为下一个上课日的第一节），超出学期时返回 None"""
+        day = slot.start.date()
+        index = next(i for i, item in enumerate(self.sections) if item[0] == slot.section)
+        if index + 1 < len(self.sections):
+            return self._slot(day, index + 1)
+        return self._first_slot_after(day)
+
+    def upcoming(self, now=None):
+        """当前时段；不在上课时段时为之后最近的一个时段"""
+        now = now or datetime.now()
+        return self.resolve(now) or self._first_slot_after(now.date())
+
+    def next_boundary(self, now=None):
+        """resolve() 结果下一次发生变化的时刻"""
+        now = now or datetime.now()
+        for _, _, end in self.sections:
+            if now.time() < end:
+                return datetime.combine(now.date(), end)
+        return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+class FreeNowScheduler:
+    def __init__(self, calendar, compute, stamp, interval=60):
+        """
+        :param calendar: SemesterCalendar
+        :param compute: compute(week, week_day, section) -> (结果, 错误信息)，结果为不按教学楼/楼层过滤的完整列表
+        :param stamp: stamp() -> 当前数据版本标识，变化时缓存失效
+        :param interval: 后台检查数据版本的最长间隔（秒）
+        """
+        self.calendar = calendar
+        self.compute = compute
+        self.stamp = stamp
+        self.interval = interval
+        self._cache = {}  # (周次, 星期, 节次) -> (数据版本, 结果)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _key(slot):
+        return slot.week, slot.week_day, slot.section
+
+    def get(self, slot):
+        """读取缓存，数据版本已变化或未预计算时返回 None"""
+        entry = self._cache.get(self._key(slot))
+        if entry is None or entry[0] != self.stamp():
+            return None
+        return entry[1]
+
+    def put(self, slot, results, stamp=None):
+        with self._lock:
+            self._cache[self._key(slot)] = (self.stamp() if stamp is None else stamp, results)
+
+    def refresh(self, now=None):
+        """预计算当前时段和下一时段，并丢弃其他时段的缓存"""
+        current = self.calendar.upcoming(now)
+        slots = [slot for slot in (current, current and self.calendar.next_slot(current)) if slot is not None]
+
+        stamp = self.stamp()
+        for slot in slots:
+            entry = self._cache.get(self._key(slot))
+            if entry is not None and entry[0] == stamp:
+                continue
+            results, error = self.compute(slot.week, slot.week_day, slot.section)
+            if error:
+                print(f"预计算第 {slot.week} 周 {slot.week_day} {slot.section} 节失败: {error}")
+                continue
+            self.put(slot, results, stamp)
+
+        keep = {self._key(slot) for slot in slots}
+        with self._lock:
+            for key in [key for key in self._cache if key not in keep]:
+                del self._cache[key]
+        return slots
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"预计算空闲教室失败: {str(e)}")
+            # 节次边界之后立即刷新，其余时间按间隔检查数据版本
+            wait = (self.calendar.next_boundary() - datetime.now()).total_seconds()
+            time.sleep(min(max(wait, 0) + 0.01, self.interval))
+
+    def start(self):
+        """启动后台线程（重复调用无影响）"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="free-now-scheduler", daemon=True)
+                self._thread.start()
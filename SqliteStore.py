@@ -0,0 +1,201 @@
+"""
+SQLite 数据后端（可选）
+
+教室和每个时间槽位的空闲状态存入本地 SQLite（WAL 模式），查询时只读取所需的行，
+不需要把整个 total_schedule.json 加载到内存。写入在一个事务内完成，刷新期间读取方
+继续看到旧数据，提交后立即看到新数据。
+
+命令行（从已有的 total_schedule.json 导入）:
+    python SqliteStore.py import total_schedule.json total_schedule.db
+"""
+import pathlib
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import serialization
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    id INTEGER PRIMARY KEY,
+    building TEXT,
+    floor,
+    room_id,
+    is_class_room INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_building_floor ON rooms (building, floor);
+
+CREATE TABLE IF NOT EXISTS slots (
+    room INTEGER NOT NULL REFERENCES rooms (id),
+    section TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    weekday TEXT NOT NULL,
+    is_free INTEGER NOT NULL,
+    PRIMARY KEY (room, section, week, weekday)
+) WITHOUT ROWID;
+-- 按周次、星期定位某间教室的各节次，查询只需读取索引
+CREATE INDEX IF NOT EXISTS idx_slots_week_weekday ON slots (week, weekday, room, section, is_free);
+"""
+
+# 从给定节次起查询各教室的空闲状态，按教室、节次排序
+FREE_SLOTS_SQL = """
+SELECT r.id, r.building, r.floor, r.room_id, s.section, s.is_free
+FROM rooms AS r
+JOIN slots AS s ON s.room = r.id
+WHERE r.is_class_room = 1
+  AND (?1 IS NULL OR r.building = ?1)
+  AND (?2 IS NULL OR r.floor = ?2)
+  AND s.section >= ?3
+  AND s.week = ?4
+  AND s.weekday = ?5
+ORDER BY r.id, s.section
+"""
+
+
+class SqliteStore:
+    def __init__(self, db_path, pool_size=8):
+        """
+        :param db_path: 数据库文件
+        :param pool_size: 只读连接池大小，同时查询数超过时等待空闲连接
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        # 只读连接池：每次查询取出一个连接，用完放回（开发服务器每个请求一个新线程，不能按线程缓存连接）
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    # ------------------ 写入 ------------------
+    def write_rooms(self, rooms):
+        """
+        用 total_schedule.json 格式的教室列表整体替换数据，单个事务内批量写入
+        :return: 写入的教室数量
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            count = 0
+            with conn:
+                conn.execute("DELETE FROM slots")
+                conn.execute("DELETE FROM rooms")
+                for pk, room in enumerate(rooms, start=1):
+                    conn.execute(
+                        "INSERT INTO rooms (id, building, floor, room_id, is_class_room) VALUES (?, ?, ?, ?, ?)",
+                        (pk, room["building"], room["floor"], room["room_id"],
+                         1 if room.get("is_class_room", False) else 0)
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO slots (room, section, week, weekday, is_free) VALUES (?, ?, ?, ?, ?)",
+                        ((pk, slot["section"], ws["week"], ws["weekDay"], 1 if ws["isFree"] else 0)
+                         for slot in room["free_time"] for ws in slot["weeks"])
+                    )
+                    count += 1
+            conn.execute("PRAGMA optimize")
+            return count
+        finally:
+            conn.close()
+
+    def import_json(self, json_file):
+        return self.write_rooms(serialization.load_file(json_file))
+
+    # ------------------ 查询 ------------------
+    def _connect(self):
+        uri = pathlib.Path(self.db_path).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=64, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """从连接池取出一个只读连接，未达上限时新建，否则等待其他查询归还"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def find_free_classrooms(self, week, week_day, section, section_order, building=None, floor=None):
+        """与 searchFreeRoomApi.find_free_classrooms 结果一致"""
+        try:
+            start_index = section_order.index(section)
+        except ValueError:
+            return []
+        sections = section_order[start_index:]
+
+        with self.connection() as conn:
+            rows = conn.execute(
+                FREE_SLOTS_SQL, (building or None, floor or None, section, week, week_day)
+            ).fetchall()
+
+        free_rooms = []
+        current_id = None
+        current = None
+        free_sections = []
+        expected = 0
+        blocked = False
+
+        def flush():
+            if current is not None and free_sections:
+                free_rooms.append({
+                    'building': current[1],
+                    'floor': current[2],
+                    'room_id': current[3],
+                    'max_continuous': len(free_sections),
+                    'free_sections': free_sections
+                })
+
+        for row in rows:
+            if row[0] != current_id:
+                flush()
+                current_id, current = row[0], row
+                free_sections = []
+                expected = 0
+                blocked = False
+            if blocked:
+                continue
+            # 节次缺失或被占用时连续空闲中断
+            if expected < len(sections) and row[4] == sections[expected] and row[5]:
+                free_sections.append(row[4])
+                expected += 1
+            elif row[4] in sections:
+                blocked = True
+        flush()
+        return free_rooms
+
+    def close(self):
+        """关闭连接池中的空闲连接"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "import":
+        print(f"已导入 {SqliteStore(sys.argv[3]).import_json(sys.argv[2])} 个教室到 {sys.argv[3]}")
+    else:
+        print(__doc__)
+        sys.exit(1)
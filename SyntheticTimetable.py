@@ -0,0 +1,264 @@
+"""
+合成课表数据生成器（用于压测和基准测试，不含任何真实学生数据）
+
+生成与教务系统导出一致的 #timetable 课表 HTML（kbcontent1 单元格，支持多地点、
+单双周、分隔线等格式），以及对应的教室一览表（xlsx）/ roomInfo.json。
+相同参数和随机种子生成的数据完全一致。
+
+示例:
+    python SyntheticTimetable.py --buildings 30 --out-dir synthetic --verify
+"""
+import argparse
+import json
+import os
+import random
+
+from ClassRoom import ClassRoom
+
+WEEKDAYS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+SECTIONS = ["0102", "0304", "0506", "0708", "0910", "1112"]
+FLOOR_NAMES = ["一楼", "二楼", "三楼", "四楼", "五楼", "六楼", "七楼", "八楼", "九楼"]
+
+# 星期、节次的抽样权重（参考真实课表：周四较少、周末和晚上极少）
+WEEKDAY_WEIGHTS = [25, 25, 25, 12, 22, 0.4, 0.05]
+SECTION_WEIGHTS = [27, 31, 24, 16, 1.2, 0]
+
+PLAIN_WEEKS = ["1-8周", "9-16周", "1-16周", "1-18周", "2-17周", "1-4,7周", "4-8,12-19周", "1,3-8周", "17周"]
+ODD_EVEN_WEEKS = ["3单周", "5单周", "2双周", "3,5,7,9,11,13,15,17单周", "4,6,8,10,12,14,16,18双周", "7,11,13单周"]
+NON_CLASSROOM_LOCATIONS = ["校内各区域", "实验楼实验室", "琴房"]
+
+SEPARATOR = "---------------------"
+
+
+class SyntheticTimetableGenerator:
+    def __init__(self, buildings=1, zones=("A", "B", "C"), floors=6, rooms_per_floor=11,
+                 courses_per_room=28, classes=None, seed=0, first_building=7,
+                 multi_location_rate=0.05, multi_group_rate=0.1, odd_even_rate=0.15,
+                 teacher_rate=0.3, non_classroom_rate=0.01):
+        """
+        :param buildings: 教学楼数量，每栋默认与七号楼规模相同
+        :param zones: 每栋楼的分区
+        :param floors: 每区楼层数
+        :param rooms_per_floor: 每层教室数（每层最后一间标记为非教室）
+        :param courses_per_room: 每间教室平均课程块数量（一个课程块可产生多条记录）
+        :param classes: 班级数量，默认按教室数推算
+        :param seed: 随机种子
+        :param multi_location_rate: 一个周次对应多个教室（逗号分隔）的比例
+        :param multi_group_rate: 一个课程块包含多组 周次/地点（分隔线隔开）的比例
+        :param odd_even_rate: 单双周表达式的比例
+        :param teacher_rate: 周次行前带教师名的比例
+        :param non_classroom_rate: 非教室地点（如“校内各区域”）的比例
+        """
+        self.buildings = buildings
+        self.zones = tuple(zones)
+        self.floors = floors
+        self.rooms_per_floor = rooms_per_floor
+        self.courses_per_room = courses_per_room
+        self.seed = seed
+        self.first_building = first_building
+        self.multi_location_rate = multi_location_rate
+        self.multi_group_rate = multi_group_rate
+        self.odd_even_rate = odd_even_rate
+        self.teacher_rate = teacher_rate
+        self.non_classroom_rate = non_classroom_rate
+
+        self._rooms = None
+        self._blocks = None
+        room_count = buildings * len(self.zones) * floors * rooms_per_floor
+        self.classes = classes or max(1, room_count)
+
+    # ------------------ 教室 ------------------
+    def rooms(self):
+        """教室一览表行：教学楼、楼层、教室号、是否教室、备注"""
+        if self._rooms is None:
+            rooms = []
+            for b in range(self.buildings):
+                building_num = self.first_building + b
+                for zone in self.zones:
+                    for floor_index in range(1, self.floors + 1):
+                        for n in range(1, self.rooms_per_floor + 1):
+                            is_class_room = n != self.rooms_per_floor
+                            rooms.append({
+                                "教学楼": f"{building_num}号楼{zone}区",
+                                "楼层": FLOOR_NAMES[floor_index - 1],
+                                "教室号": floor_index * 100 + n,
+                                "是否教室": "教室" if is_class_room else "非教室",
+                                "备注": "" if is_class_room else "办公室",
+                                # 课表中出现的地点写法，如 7号楼A101
+                                "location": f"{building_num}号楼{zone}{floor_index * 100 + n}",
+                            })
+            self._rooms = rooms
+        return self._rooms
+
+    def class_rooms(self):
+        """与 utils.read_class_room_data 结果一致的 ClassRoom 列表"""
+        return [ClassRoom(r["教学楼"], r["楼层"], r["教室号"], r["是否教室"] == "教室") for r in self.rooms()]
+
+    # ------------------ 课程块 ------------------
+    def _weeks(self, rng):
+        if rng.random() < self.odd_even_rate:
+            return rng.choice(ODD_EVEN_WEEKS)
+        return rng.choice(PLAIN_WEEKS)
+
+    def _location(self, rng, room_index):
+        rooms = self.rooms()
+        if rng.random() < self.non_classroom_rate:
+            return rng.choice(NON_CLASSROOM_LOCATIONS)
+        location = rooms[room_index]["location"]
+        if rng.random() < self.multi_location_rate and room_index + 1 < len(rooms):
+            location += "," + rooms[room_index + 1]["location"]
+        return location
+
+    def blocks(self):
+        """
+        课程块列表，每个课程块对应一个 kbcontent1 div:
+        {"class": 班级序号, "cell": 单元格序号, "course": 课程名, "class_name": 班级名,
+         "groups": [(周次, 地点, 教师或 None), ...]}
+        """
+        if self._blocks is None:
+            rng = random.Random(self.seed)
+            blocks = []
+            for room_index in range(len(self.rooms())):
+                for _ in range(self.courses_per_room):
+                    class_index = rng.randrange(self.classes)
+                    weekday = rng.choices(range(7), WEEKDAY_WEIGHTS)[0]
+                    section = rng.choices(range(6), SECTION_WEIGHTS)[0]
+                    group_count = 2 if rng.random() < self.multi_group_rate else 1
+                    groups = []
+                    for _ in range(group_count):
+                        teacher = f"教师{rng.randint(1, 999)}" if rng.random() < self.teacher_rate else None
+                        groups.append((self._weeks(rng), self._location(rng, room_index), teacher))
+                    blocks.append({
+                        "class": class_index,
+                        "cell": weekday * 6 + section,
+                        "course": f"课程{rng.randint(1, 2000)}",
+                        "class_name": self.class_name(class_index),
+                        "groups": groups,
+                    })
+            self._blocks = blocks
+        return self._blocks
+
+    @staticmethod
+    def class_name(class_index):
+        return f"专业{class_index // 4 + 1}本2022-{class_index % 4 + 1}"
+
+    def records(self):
+        """CourseTableParser.parse_course_table_from_html2 对生成的 HTML 应得到的记录"""
+        records = []
+        for block in self.blocks():
+            weekday, section = WEEKDAYS[block["cell"] // 6], SECTIONS[block["cell"] % 6]
+            for weeks, location, _ in block["groups"]:
+                for loc in location.split(","):
+                    records.append({
+                        "weekDay": weekday,
+                        "section": section,
+                        "courseName": block["course"],
+                        "className": block["class_name"],
+                        "weeks": weeks,
+                        "classRoom": loc,
+                    })
+        return records
+
+    # ------------------ HTML ------------------
+    @staticmethod
+    def _div(block):
+        lines = [block["course"], block["class_name"]]
+        for i, (weeks, location, teacher) in enumerate(block["groups"]):
+            if i > 0:
+                lines.append(SEPARATOR)
+            lines.append(f"<font title='老师(周次)'>{teacher or ''}({weeks})</font>")
+            lines.append(f"<font title='教室'>{location}</font>")
+        return "<div class=\"kbcontent1\">" + "<br/>".join(lines) + "</div>"
+
+    def iter_html(self):
+        """逐行生成课表 HTML，避免大规模数据一次性拼接"""
+        by_class = {}
+        for block in self.blocks():
+            by_class.setdefault(block["class"], {}).setdefault(block["cell"], []).append(block)
+
+        yield "<html><head><meta charset=\"utf-8\"></head><body>\n"
+        yield "<table id=\"timetable\">\n"
+        # 表头两行：星期、节次
+        yield "<tr><th>班级</th>" + "".join(f"<th colspan=\"6\">{d}</th>" for d in WEEKDAYS) + "<th>备注</th></tr>\n"
+        yield "<tr><th></th>" + "".join(f"<th>{s}</th>" for _ in WEEKDAYS for s in SECTIONS) + "<th></th></tr>\n"
+        for class_index in sorted(by_class):
+            cells = by_class[class_index]
+            row = [f"<tr><td>{self.class_name(class_index)}</td>"]
+            for cell in range(len(WEEKDAYS) * len(SECTIONS)):
+                row.append("<td>" + "".join(self._div(b) for b in cells.get(cell, [])) + "</td>")
+            row.append("<td></td></tr>\n")
+            yield "".join(row)
+        yield "</table>\n</body></html>\n"
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    # ------------------ 输出文件 ------------------
+    def write_html(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as f:
+            for chunk in self.iter_html():
+                f.write(chunk)
+
+    def write_room_sheet(self, file_path):
+        """教室一览表 xlsx，表头与“七号楼教室一览表.xlsx”一致"""
+        import openpyxl
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        columns = ["教学楼", "楼层", "教室号", "是否教室", "备注"]
+        ws.append(columns)
+        for room in self.rooms():
+            ws.append([room[c] for c in columns])
+        wb.save(file_path)
+
+    def write_room_json(self, file_path):
+        """与 getSchedule.getRoomBase 输出一致的 roomInfo.json"""
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump([room.__dict__ for room in self.class_rooms()], f, ensure_ascii=False)
+
+    def write_records_json(self, file_path):
+        """与 CourseTableParser.run 输出一致的 tableInfo.json"""
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.records(), f, ensure_ascii=False)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="生成合成课表 HTML 与教室一览表")
+    arg_parser.add_argument("--buildings", type=int, default=1, help="教学楼数量（每栋为七号楼规模）")
+    arg_parser.add_argument("--floors", type=int, default=6, help="每区楼层数")
+    arg_parser.add_argument("--rooms-per-floor", type=int, default=11, help="每层教室数")
+    arg_parser.add_argument("--courses-per-room", type=int, default=28, help="每间教室课程块数量")
+    arg_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    arg_parser.add_argument("--out-dir", default="synthetic", help="输出目录")
+    arg_parser.add_argument("--verify", action="store_true", help="用 CourseTableParser 解析生成的 HTML 并校验结果")
+    args = arg_parser.parse_args(argv)
+
+    generator = SyntheticTimetableGenerator(
+        buildings=args.buildings, floors=args.floors, rooms_per_floor=args.rooms_per_floor,
+        courses_per_room=args.courses_per_room, seed=args.seed
+    )
+    os.makedirs(args.out_dir, exist_ok=True)
+    html_file = os.path.join(args.out_dir, "kebiao.html")
+    generator.write_html(html_file)
+    generator.write_room_sheet(os.path.join(args.out_dir, "教室一览表.xlsx"))
+    generator.write_room_json(os.path.join(args.out_dir, "roomInfo.json"))
+    generator.write_records_json(os.path.join(args.out_dir, "tableInfo.json"))
+    print(f"已生成 {len(generator.rooms())} 个教室、{len(generator.records())} 条课表记录 → {args.out_dir}")
+
+    if args.verify:
+        from CourseTableParser import CourseTableParser
+
+        def as_key(record):
+            return tuple(record[k] for k in ("weekDay", "section", "courseName", "className", "weeks", "classRoom"))
+
+        parsed = CourseTableParser(html_file, os.path.join(args.out_dir, "parsed.json")).parse_course_table_from_html2()
+        if sorted(map(as_key, parsed)) == sorted(map(as_key, generator.records())):
+            print("校验通过: 解析结果与生成记录一致")
+        else:
+            print(f"校验失败: 解析得到 {len(parsed)} 条，生成 {len(generator.records())} 条")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
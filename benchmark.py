@@ -0,0 +1,257 @@
+"""
+性能基准测试（完全离线）
+
+使用 SyntheticTimetable 按七号楼规模的 1×/10×/100× 生成课表与教室数据，
+测量解析、处理、保存与查询各热点函数的耗时，结果保存为 JSON，
+可与历史结果对比，超过允许的退化比例时以非零状态退出。
+另在子进程中测量 API 冷启动（导入 + 加载数据集）耗时，超过 --max-startup 或
+导入了流水线依赖（pandas、openpyxl 等）时同样以非零状态退出。
+
+示例:
+    python benchmark.py --scales 1,10 --output bench_results.json
+    python benchmark.py --baseline bench_results.json --max-regression 0.2
+    python benchmark.py --scales 10 --max-startup 1.0
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from CourseRecord import parse_week_mask
+from CourseTableParser import CourseTableParser
+from DatasetStore import DatasetStore
+from PackedSchedule import snapshot_path_for
+from ScheduleParser import ClassScheduleProcessor, REVERSE_WEEKDAY_MAPPING
+from searchFreeRoomApi import find_free_classrooms, SECTION_ORDER
+from SyntheticTimetable import SyntheticTimetableGenerator
+
+
+# API 进程不应导入的流水线依赖
+HEAVY_MODULES = ("pandas", "openpyxl", "bs4", "lxml", "ddddocr", "requests")
+
+# 在全新的解释器中导入 API 并加载当前数据集，输出各阶段耗时
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import searchFreeRoomApi
+imported = time.perf_counter()
+data, error = searchFreeRoomApi.load_classroom_data()
+loaded = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "load": loaded - imported,
+    "error": error,
+    "data": type(data).__name__,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+# ------------------ 计时 ------------------
+def measure(func, setup=None, repeat=3):
+    """执行 repeat 次，每次先调用 setup（不计时），返回耗时统计"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(arg)
+            times.append(time.perf_counter() - start)
+    return {
+        "min": round(min(times), 6),
+        "median": round(statistics.median(times), 6),
+        "repeat": repeat,
+    }
+
+
+def measure_startup(workdir, repeat=3):
+    """在 workdir 中启动 repeat 个新进程，测量从解释器启动到数据加载完成的总耗时"""
+    script = STARTUP_SCRIPT.format(repo=os.path.dirname(os.path.abspath(__file__)), heavy=HEAVY_MODULES)
+    times = []
+    details = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=workdir, text=True)
+        times.append(time.perf_counter() - start)
+        details = json.loads(output.strip().splitlines()[-1])
+    if details["error"]:
+        raise RuntimeError(f"API 启动时加载数据失败: {details['error']}")
+    return {
+        "min": round(min(times), 6),
+        "median": round(statistics.median(times), 6),
+        "repeat": repeat,
+        "import": round(details["import"], 6),
+        "load": round(details["load"], 6),
+        "data": details["data"],
+        "heavy_modules": details["heavy_modules"],
+    }
+
+
+def run_scale(scale, workdir, repeat, seed):
+    # 每个规模单位为一栋七号楼大小的教学楼
+    generator = SyntheticTimetableGenerator(buildings=scale, seed=seed)
+    rooms = generator.rooms()
+    records = generator.records()
+
+    html_file = os.path.join(workdir, "kebiao.html")
+    room_file = os.path.join(workdir, "roomInfo.json")
+    table_file = os.path.join(workdir, "tableInfo.json")
+    output_file = os.path.join(workdir, "total_schedule.json")
+    excel_file = os.path.join(workdir, "process_log.xlsx")
+
+    generator.write_html(html_file)
+    generator.write_room_json(room_file)
+    generator.write_records_json(table_file)
+
+    def new_processor():
+        processor = ClassScheduleProcessor(room_file, table_file, output_file, debug_excel=excel_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.load_classrooms()
+        return processor
+
+    def processed():
+        processor = new_processor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.process_schedule()
+        return processor
+
+    week_strings = [r["weeks"] for r in records]
+    room_strings = [r["classRoom"] for r in records]
+
+    results = {"rooms": len(rooms), "records": len(records), "cases": {}}
+    cases = results["cases"]
+
+    parser = CourseTableParser(html_file, os.path.join(workdir, "parsed.json"))
+    cases["parse_course_table_from_html2"] = measure(lambda _: parser.parse_course_table_from_html2(), repeat=repeat)
+
+    def uncached_processor():
+        # parse_week_mask 带全局缓存，每次先清空，避免只测到缓存命中
+        parse_week_mask.cache_clear()
+        return new_processor()
+
+    cases["parse_weeks"] = measure(lambda p: [p.parse_weeks(w) for w in week_strings], uncached_processor, repeat)
+    cases["normalize_classroom"] = measure(lambda p: [p.normalize_classroom(r) for r in room_strings],
+                                           new_processor, repeat)
+    cases["process_schedule"] = measure(lambda p: p.process_schedule(), new_processor, repeat)
+    cases["save_results"] = measure(lambda p: p.save_results(), processed, repeat)
+
+    with open(output_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    queries = [(week, REVERSE_WEEKDAY_MAPPING[day], section)
+               for week in (1, 9, 17) for day in range(1, 6) for section in SECTION_ORDER]
+    cases["find_free_classrooms"] = measure(
+        lambda _: [find_free_classrooms(data, *q) for q in queries], repeat=repeat)
+    cases["find_free_classrooms"]["queries"] = len(queries)
+
+    # 发布到 workdir/datasets，API 子进程使用默认配置读取；分别测量有无快照的冷启动
+    store = DatasetStore(root=os.path.join(workdir, "datasets"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        version = store.publish(output_file)
+    cases["api_startup"] = measure_startup(workdir, repeat)
+    snapshot_file = snapshot_path_for(store.path_of(version))
+    if os.path.exists(snapshot_file):
+        os.remove(snapshot_file)
+    cases["api_startup_json"] = measure_startup(workdir, repeat)
+
+    return results
+
+
+# ------------------ 结果对比 ------------------
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, max_regression):
+    """返回超过允许退化比例的用例列表"""
+    regressions = []
+    for scale, result in current["scales"].items():
+        base_result = baseline.get("scales", {}).get(scale)
+        if not base_result:
+            continue
+        for case, stats in result["cases"].items():
+            base_stats = base_result["cases"].get(case)
+            if not base_stats or base_stats["median"] <= 0:
+                continue
+            ratio = stats["median"] / base_stats["median"] - 1
+            if ratio > max_regression:
+                regressions.append((scale, case, base_stats["median"], stats["median"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="空闲教室流水线与接口性能基准测试")
+    arg_parser.add_argument("--scales", default="1,10", help="数据规模倍数，逗号分隔（默认 1,10，可加 100）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数")
+    arg_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    arg_parser.add_argument("--output", default="bench_results.json", help="结果输出文件")
+    arg_parser.add_argument("--baseline", help="用于对比的历史结果文件")
+    arg_parser.add_argument("--max-regression", type=float, default=0.2,
+                            help="允许的中位耗时退化比例，超过则失败（默认 0.2 即 20%%）")
+    arg_parser.add_argument("--max-startup", type=float, default=1.0,
+                            help="API 冷启动（含快照）允许的最长中位耗时，单位秒（默认 1.0）")
+    args = arg_parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "scales": {},
+    }
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix="freeroom_bench_") as workdir:
+            result = run_scale(scale, workdir, args.repeat, args.seed)
+        report["scales"][f"{scale}x"] = result
+        print(f"规模 {scale}x: {result['rooms']} 个教室, {result['records']} 条课表记录")
+        for case, stats in result["cases"].items():
+            print(f"  {case:<32} 中位 {stats['median'] * 1000:10.2f} ms  最快 {stats['min'] * 1000:10.2f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+    failed = False
+    for scale, result in report["scales"].items():
+        startup = result["cases"]["api_startup"]
+        if startup["heavy_modules"]:
+            print(f"{scale} API 启动时导入了流水线依赖: {', '.join(startup['heavy_modules'])}")
+            failed = True
+        if startup["median"] > args.max_startup:
+            print(f"{scale} API 冷启动 {startup['median']:.3f} s，超过 {args.max_startup:.3f} s")
+            failed = True
+    if failed:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能退化（允许 {args.max_regression:.0%}）:")
+            for scale, case, before, after, ratio in regressions:
+                print(f"  {scale} {case}: {before * 1000:.2f} ms → {after * 1000:.2f} ms (+{ratio:.0%})")
+            return 1
+        print(f"与 {args.baseline} 对比未发现超过 {args.max_regression:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,17 @@ import os
 import shutil
 import time
 import urllib
+from contextlib import nullcontext
 from datetime import datetime
 
-import ddddocr
 import requests
-from lxml import etree
 
+from BackupArchive import BackupArchive
+from ConflictDetector import ConflictDetector
 from CourseTableParser import CourseTableParser
+from DatasetStore import DatasetStore
 from ScheduleParser import ClassScheduleProcessor
+from profiler import StageProfiler
 from utils import read_class_room_data, convert_to_json, save_json_to_file
 
 
@@ -36,6 +39,7 @@ class GetSchedule:
     roomJsonSaveName = None
     tableJsonSaveName = None
     scheduleJsonSaveName = None
+    conflictReportSaveName = "conflict_report.json"
 
     def __init__(self):
         config = configparser.ConfigParser()
@@ -51,12 +55,37 @@ class GetSchedule:
         self.tableJsonSaveName = config['fileName']['tableInfoSaveTo']
         self.scheduleJsonSaveName = config['fileName']['scheduleInfoSaveTo']
 
+        # 存在时间地点冲突时是否终止，不生成 total_schedule.json
+        self.failOnConflict = config.getboolean('conflict', 'failOnConflict', fallback=False)
+        self.tableRecords = None
+
+        # 数据后端为 sqlite 时同时写入 SQLite 数据库
+        self.sqliteFile = None
+        if config.get('dataset', 'backend', fallback='json') == 'sqlite':
+            self.sqliteFile = config.get('dataset', 'sqlitePath', fallback='total_schedule.db')
+
+        # 备份方式：copy 为目录式完整备份，archive 为压缩去重归档（backup/archive）
+        self.backupMode = config.get('backup', 'mode', fallback='copy')
+
+        # 性能记录：各阶段耗时/内存，运行报告随备份保存
+        self.profiler = None
+        if config.getboolean('profile', 'enabled', fallback=True):
+            self.profiler = StageProfiler(
+                name="getSchedule",
+                trace_memory=config.getboolean('profile', 'traceMemory', fallback=False),
+                cprofile_dir="profile" if config.getboolean('profile', 'cProfile', fallback=False) else None
+            )
+
     def login(self):
         # TODO: 登录并获取cookies
         account_encoded = base64.b64encode(self.account.encode('utf-8'))
         password_encoded = base64.b64encode(self.password.encode('utf-8'))
         encoded = account_encoded.decode('utf-8') + "%%%" + password_encoded.decode('utf-8')
 
+        # ddddocr、lxml 导入较慢，只在登录时导入
+        import ddddocr
+        from lxml import etree
+
         # 初始化ddddocr识别验证码
         ocr = ddddocr.DdddOcr(show_ad=False)
         # 获取验证码图片
@@ -123,12 +152,27 @@ class GetSchedule:
         print("开始解析教室数据:" + self.roomFileName, "  并转为JSON数据保存为:" + self.roomJsonSaveName)
         res = read_class_room_data(self.roomFileName)
         save_json_to_file(convert_to_json(res), self.roomJsonSaveName)
+        return res
 
     def getTableInfo(self):
         # TODO: 根据总课表HTML解析出每个课程的数据保存为tableJsonSaveName
         print("开始解析总课表:" + self.kbFileName, "  并转为JSON数据保存为:" + self.tableJsonSaveName)
         parser = CourseTableParser(self.kbFileName, self.tableJsonSaveName)
-        parser.run()
+        # 解析时已逐条完成校验，verbose 输出校验报告
+        res = parser.run(verbose=True)
+        self.tableRecords = parser.records
+        return res
+
+    def checkConflicts(self):
+        # TODO: 检查课表中同一教室同一时段周次重叠的课程，结果保存为conflictReportSaveName
+        print("开始检查时间地点冲突，报告保存为:" + self.conflictReportSaveName)
+        detector = ConflictDetector()
+        detector.detect(self.tableRecords)
+        detector.print_report()
+        detector.save_report(self.conflictReportSaveName)
+        if detector.conflicts and self.failOnConflict:
+            raise RuntimeError(f"发现 {len(detector.conflicts)} 个时间地点冲突，已终止（config.ini [conflict] failOnConflict）")
+        return detector.conflicts
 
     def getTotalSchedule(self):
         # TODO: 根据总课表tableInfo.json和教室数据roomInfo.json生成totalSchedule总空闲情况数据
@@ -136,28 +180,84 @@ class GetSchedule:
             room_base_file=self.roomJsonSaveName,
             schedule_file=self.tableJsonSaveName,
             output_file=self.scheduleJsonSaveName,
-            debug_excel="process_log.xlsx"
+            debug_excel="process_log.xlsx",
+            profiler=self.profiler,
+            sqlite_file=self.sqliteFile,
+            # 直接使用解析阶段已解码的记录，不再重新读取 tableInfo.json
+            records=self.tableRecords
         )
         processor.run()
 
+    def publishDataset(self):
+        # TODO: 将total_schedule发布为数据集新版本，API无需重启即切换到新版本
+        store = DatasetStore(file_name=os.path.basename(self.scheduleJsonSaveName))
+        return store.publish(self.scheduleJsonSaveName)
+
     def backup_files(self):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        fnames = [self.kbFileName, self.roomJsonSaveName, self.tableJsonSaveName, self.scheduleJsonSaveName,
+                  "process_log.xlsx", "parsing_problems.json", self.conflictReportSaveName]
+
+        if self.backupMode == "archive":
+            # 压缩并按内容去重，未变化的文件不重复占用空间；返回快照名
+            return BackupArchive().archive_files(fnames, snapshot=timestamp, remove=True)
+
         backup_dir = f"backup/{timestamp}"
         os.makedirs(backup_dir, exist_ok=True)
 
-        for fname in [self.kbFileName, self.roomJsonSaveName, self.tableJsonSaveName, self.scheduleJsonSaveName,
-                      "process_log.xlsx"]:
+        for fname in fnames:
             if os.path.exists(fname):
                 shutil.move(fname, os.path.join(backup_dir, os.path.basename(fname)))
                 print(f"已备份 {fname} → {backup_dir}")
 
+        return backup_dir
+
+    def stage(self, name):
+        """开启性能记录时记录阶段，否则返回空上下文"""
+        if self.profiler is None:
+            return nullcontext({})
+        return self.profiler.stage(name)
+
+    def saveRunReport(self, backup_dir):
+        # 运行报告与本次备份放在一起，cProfile 文件一并移入
+        if self.profiler is None:
+            return
+        if self.backupMode == "archive":
+            # backup_dir 为归档快照名，报告与 cProfile 文件追加到同一快照
+            self.profiler.print_summary()
+            self.profiler.save("run_report.json")
+            files = {"run_report.json": "run_report.json"}
+            if self.profiler.cprofile_dir and os.path.isdir(self.profiler.cprofile_dir):
+                for name in os.listdir(self.profiler.cprofile_dir):
+                    files[f"profile/{name}"] = os.path.join(self.profiler.cprofile_dir, name)
+            BackupArchive().archive_files(files, snapshot=backup_dir, remove=True)
+            if self.profiler.cprofile_dir and os.path.isdir(self.profiler.cprofile_dir):
+                shutil.rmtree(self.profiler.cprofile_dir)
+            return
+        if self.profiler.cprofile_dir and os.path.isdir(self.profiler.cprofile_dir):
+            shutil.move(self.profiler.cprofile_dir, os.path.join(backup_dir, "profile"))
+        self.profiler.print_summary()
+        self.profiler.save(os.path.join(backup_dir, "run_report.json"))
+
 
 if __name__ == "__main__":
     GetSchedule = GetSchedule()
-    GetSchedule.login()
-    GetSchedule.downloadKb()
-    GetSchedule.getRoomBase()
-    GetSchedule.getTableInfo()
-    GetSchedule.getTotalSchedule()
+    with GetSchedule.stage("login"):
+        GetSchedule.login()
+    with GetSchedule.stage("download"):
+        GetSchedule.downloadKb()
+    with GetSchedule.stage("room_base") as st:
+        st["records"] = len(GetSchedule.getRoomBase())
+    with GetSchedule.stage("parse_html") as st:
+        st["records"] = len(GetSchedule.getTableInfo())
+    with GetSchedule.stage("check_conflicts") as st:
+        GetSchedule.checkConflicts()
+        st["records"] = len(GetSchedule.tableRecords)
+    with GetSchedule.stage("total_schedule"):
+        GetSchedule.getTotalSchedule()
+    with GetSchedule.stage("publish"):
+        GetSchedule.publishDataset()
     # 移动所有产生的文件到备份文件夹，文件夹命名为留档时间
-    GetSchedule.backup_files()
\ No newline at end of file
+    with GetSchedule.stage("backup"):
+        backupDir = GetSchedule.backup_files()
+    GetSchedule.saveRunReport(backupDir)
\ No newline at end of file
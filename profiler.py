@@ -0,0 +1,156 @@
+"""
+流水线分阶段性能记录：耗时、内存峰值、吞吐量，可选每阶段 cProfile 输出
+"""
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource 模块
+    resource = None
+
+
+def get_peak_rss_kb():
+    """进程常驻内存峰值（KB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    if os.uname().sysname == 'Darwin':
+        peak //= 1024
+    return peak
+
+
+class StageProfiler:
+    def __init__(self, name="getSchedule", trace_memory=False, cprofile_dir=None):
+        """
+        :param name: 本次运行名称
+        :param trace_memory: 是否使用 tracemalloc 统计每阶段 Python 内存峰值（会使耗时明显变长）
+        :param cprofile_dir: 不为空时每个顶层阶段输出 <阶段名>.prof 到该目录
+        """
+        self.name = name
+        self.trace_memory = trace_memory
+        self.cprofile_dir = cprofile_dir
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = []
+        self._current = None
+
+    @contextmanager
+    def stage(self, name, records=None):
+        """
+        记录一个阶段，可在 with 块内设置处理记录数:
+            with profiler.stage("parse") as st:
+                st["records"] = len(res)
+        """
+        entry = {"name": name, "records": records, "substages": []}
+        parent, self._current = self._current, entry
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            elif parent is not None:
+                # 嵌套阶段会重置峰值，先把外层阶段已达到的峰值记下来
+                parent["_peak_before_child"] = max(
+                    parent.get("_peak_before_child", 0), tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        profile = None
+        # cProfile 不能嵌套启用，只对最外层阶段输出
+        if self.cprofile_dir and parent is None:
+            profile = cProfile.Profile()
+            profile.enable()
+
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            wall = time.perf_counter() - start
+
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                prof_file = os.path.join(self.cprofile_dir, f"{name}.prof")
+                profile.dump_stats(prof_file)
+                entry["cprofile"] = prof_file
+
+            if self.trace_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], entry.pop("_peak_before_child", 0))
+                entry["tracemalloc_peak_kb"] = peak // 1024
+                if started_tracing:
+                    tracemalloc.stop()
+
+            entry["wall_seconds"] = round(wall, 6)
+            entry["peak_rss_kb"] = get_peak_rss_kb()
+            entry["records_per_second"] = self._throughput(entry["records"], wall)
+
+            self._current = parent
+            if parent is not None:
+                parent["substages"].append(entry)
+            else:
+                self.stages.append(entry)
+
+    def record(self, name, seconds, records=None):
+        """记录累计耗时的子阶段（如逐条记录内的标准化、标记），挂在当前阶段下"""
+        entry = {
+            "name": name,
+            "wall_seconds": round(seconds, 6),
+            "records": records,
+            "records_per_second": self._throughput(records, seconds),
+        }
+        if self._current is not None:
+            self._current["substages"].append(entry)
+        else:
+            self.stages.append(entry)
+
+    @staticmethod
+    def _throughput(records, seconds):
+        if not records or seconds <= 0:
+            return None
+        return round(records / seconds, 2)
+
+    @property
+    def timings_traced(self):
+        return bool(self.trace_memory or self.cprofile_dir)
+
+    def report(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "peak_rss_kb": get_peak_rss_kb(),
+            # tracemalloc / cProfile 开启时各阶段耗时被放大（tracemalloc 约 10 倍），不能与未开启时的结果对比
+            "timings_traced": self.timings_traced,
+            "stages": self.stages,
+        }
+
+    def save(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        print(f"运行报告已保存到 {file_path}")
+
+    def print_summary(self):
+        print("=" * 50)
+        print("各阶段耗时")
+        print("=" * 50)
+        if self.timings_traced:
+            print("注意: 已开启 tracemalloc/cProfile，以下耗时被放大，仅供相对比较")
+        for entry in self.stages:
+            self._print_entry(entry, 0)
+
+    def _print_entry(self, entry, depth):
+        line = f"{'  ' * depth}{entry['name']}: {entry['wall_seconds']:.3f}s"
+        if entry.get("records"):
+            line += f"  记录数 {entry['records']}"
+        if entry.get("tracemalloc_peak_kb") is not None:
+            line += f"  内存峰值 {entry['tracemalloc_peak_kb']}KB"
+        print(line)
+        for sub in entry.get("substages", []):
+            self._print_entry(sub, depth + 1)
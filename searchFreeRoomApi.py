@@ -1,28 +1,185 @@
-from flask import Flask, request, jsonify
-import json
+from flask import Flask, request, jsonify, g, Response
+from flask.json.provider import JSONProvider
+import math
 import os
+import threading
+import time
+
+import metrics
+import serialization
+import settings
+from DatasetStore import DatasetStore
+from PackedSchedule import PackedSchedule, snapshot_path_for
+from SemesterCalendar import FreeNowScheduler, SemesterCalendar
+from throttle import InflightLimiter, OverloadedError, SingleFlight, TokenBucketLimiter
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    jsonify 使用 serialization 的快速后端，直接输出 UTF-8 字节（中文不转义为 \\uXXXX）；
+    与 Flask 默认一致按键排序，响应中的键顺序保持稳定
+    """
+
+    sort_keys = True
+
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps_str(obj, sort_keys=kwargs.pop('sort_keys', self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serialization.dumps(obj, sort_keys=self.sort_keys),
+                                        mimetype='application/json')
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
-# 配置JSON文件路径（部署时可修改）
+# 配置JSON文件路径（部署时可修改），数据集仓库未发布过版本时使用
 JSON_FILE_PATH = 'total_schedule.json'
 
+# 版本化数据集仓库，发布新版本或回滚后无需重启即可生效
+DATASET_STORE = DatasetStore()
+
+# 数据后端：json 读取整个数据文件；sqlite 按需查询 SQLite 数据库
+DATA_BACKEND = settings.get_str('dataset', 'backend', fallback='json')
+SQLITE_STORE = None
+if DATA_BACKEND == 'sqlite':
+    from SqliteStore import SqliteStore
+    SQLITE_STORE = SqliteStore(settings.get_str('dataset', 'sqlitePath', fallback='total_schedule.db'),
+                               settings.get_int('dataset', 'sqlitePoolSize', fallback=8))
+
 # 定义节次顺序（用于连续节次查询）
 SECTION_ORDER = ['0102', '0304', '0506', '0708', '0910']
 
+# ------------------ 指标 ------------------
+REQUEST_LATENCY = metrics.histogram(
+    'freeroom_request_duration_seconds', '接口请求耗时', ['endpoint'])
+REQUEST_TOTAL = metrics.counter(
+    'freeroom_requests_total', '接口请求次数', ['endpoint', 'status'])
+REQUEST_ERRORS = metrics.counter(
+    'freeroom_request_errors_total', '接口错误次数（按错误原因）', ['endpoint', 'reason'])
+DATA_LOAD_SECONDS = metrics.histogram(
+    'freeroom_data_load_seconds', '教室数据加载/重载耗时')
+QUERY_SECONDS = metrics.histogram(
+    'freeroom_query_seconds', '空闲教室查询计算耗时')
+CACHE_LOOKUPS = metrics.counter(
+    'freeroom_cache_lookups_total', '缓存命中情况', ['cache', 'result'])
+DATASET_VERSION = metrics.gauge(
+    'freeroom_dataset_version', '当前数据集版本（数据文件修改时间戳）')
+DATASET_SWAPS = metrics.counter(
+    'freeroom_dataset_swaps_total', '数据集切换/重载结果', ['result'])
+DATASET_ROOMS = metrics.gauge(
+    'freeroom_dataset_rooms', '当前数据集教室数量')
+COALESCED_QUERIES = metrics.counter(
+    'freeroom_coalesced_queries_total', '空闲教室查询合并情况（leader 实际计算，shared 共享结果）', ['result'])
+THROTTLED_REQUESTS = metrics.counter(
+    'freeroom_throttled_requests_total', '被限流拒绝的请求', ['reason'])
+
+# ------------------ 限流与请求合并 ------------------
+# 相同参数的并发查询只计算一次
+QUERY_FLIGHT = SingleFlight()
+
+# 按客户端 IP 的令牌桶限流，以及同时处理的查询数量上限
+RATE_LIMIT_ENABLED = settings.get_bool('rateLimit', 'enabled', fallback=True)
+RATE_LIMITER = TokenBucketLimiter(
+    settings.get_float('rateLimit', 'rate', fallback=5.0),
+    settings.get_float('rateLimit', 'burst', fallback=20.0),
+    settings.get_int('rateLimit', 'maxClients', fallback=10000))
+TRUST_PROXY = settings.get_bool('rateLimit', 'trustProxy', fallback=False)
+QUERY_INFLIGHT = InflightLimiter(settings.get_int('rateLimit', 'maxInflight', fallback=32))
+
+# 校历，config.ini 未配置 [calendar] termStart 时 /api/free_now 不可用
+CALENDAR = SemesterCalendar.from_config()
+FREE_NOW_SCHEDULER = None
+_scheduler_lock = threading.Lock()
+
+# 已加载数据缓存，数据集版本或数据文件变化（修改时间或大小）时自动重载
+_data_cache = {'stamp': None, 'data': None, 'failed_stamp': None}
+_data_lock = threading.Lock()
+
+
+def resolve_data_path():
+    """当前数据文件路径：优先使用数据集仓库的当前版本"""
+    return DATASET_STORE.current_path() or JSON_FILE_PATH
+
+
+def load_dataset_file(data_path):
+    """优先读取发布时生成的紧凑快照，快照不存在或已失效时解析 JSON"""
+    snapshot_path = snapshot_path_for(data_path)
+    if os.path.exists(snapshot_path):
+        try:
+            packed = PackedSchedule.load(snapshot_path, data_path)
+            if packed is not None:
+                CACHE_LOOKUPS.inc(cache='snapshot', result='hit')
+                return packed
+        except Exception as e:
+            print(f"读取数据集快照失败，改为解析 JSON: {str(e)}")
+    CACHE_LOOKUPS.inc(cache='snapshot', result='miss')
+    return serialization.load_file(data_path)
+
 
 def load_classroom_data():
     """加载教室数据"""
     try:
-        if not os.path.exists(JSON_FILE_PATH):
-            return None, f"JSON文件不存在: {JSON_FILE_PATH}"
+        data_path = resolve_data_path()
+        if not os.path.exists(data_path):
+            if _data_cache['data'] is not None:
+                # 版本刚被清理等情况下继续使用已加载的数据
+                DATASET_SWAPS.inc(result='missing')
+                return _data_cache['data'], None
+            return None, f"JSON文件不存在: {data_path}"
+
+        stat = os.stat(data_path)
+        stamp = (data_path, stat.st_mtime_ns, stat.st_size)
+        if _data_cache['stamp'] == stamp or _data_cache['failed_stamp'] == stamp:
+            CACHE_LOOKUPS.inc(cache='dataset', result='hit')
+            return _data_cache['data'], None
 
-        with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f), None
+        with _data_lock:
+            if _data_cache['stamp'] == stamp or _data_cache['failed_stamp'] == stamp:
+                CACHE_LOOKUPS.inc(cache='dataset', result='hit')
+                return _data_cache['data'], None
+
+            CACHE_LOOKUPS.inc(cache='dataset', result='miss')
+            try:
+                with DATA_LOAD_SECONDS.time():
+                    data = load_dataset_file(data_path)
+            except Exception:
+                if _data_cache['data'] is None:
+                    raise
+                # 新版本加载失败时继续使用旧数据，同一文件不再重复尝试
+                _data_cache['failed_stamp'] = stamp
+                DATASET_SWAPS.inc(result='failed')
+                return _data_cache['data'], None
+            _data_cache['data'] = data
+            _data_cache['stamp'] = stamp
+            DATASET_SWAPS.inc(result='loaded')
+            DATASET_VERSION.set(stat.st_mtime)
+            DATASET_ROOMS.set(len(data))
+            return data, None
     except Exception as e:
         return None, f"加载数据失败: {str(e)}"
 
 
+def dataset_stamp():
+    """当前数据的版本标识，数据集发布、回滚或数据库刷新后变化"""
+    if SQLITE_STORE is not None:
+        paths = (SQLITE_STORE.db_path, SQLITE_STORE.db_path + '-wal')
+    else:
+        paths = (resolve_data_path(),)
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamp.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamp.append((path, None, None))
+    return tuple(stamp)
+
+
 def is_room_free_for_section(room, week, week_day, section):
     """检查指定节次是否空闲"""
     for time_slot in room['free_time']:
@@ -75,6 +232,24 @@ def find_free_classrooms(data, week, week_day, section, building=None, floor=Non
     return free_rooms
 
 
+def query_free_classrooms(week, week_day, section, building=None, floor=None):
+    """按配置的数据后端查询空闲教室，返回 (结果, 错误信息)"""
+    if SQLITE_STORE is not None:
+        try:
+            with QUERY_SECONDS.time():
+                return SQLITE_STORE.find_free_classrooms(week, week_day, section, SECTION_ORDER, building, floor), None
+        except Exception as e:
+            return None, f"查询数据库失败: {str(e)}"
+
+    data, error = load_classroom_data()
+    if error:
+        return None, error
+    with QUERY_SECONDS.time():
+        if isinstance(data, PackedSchedule):
+            return data.find_free_classrooms(week, week_day, section, SECTION_ORDER, building, floor), None
+        return find_free_classrooms(data, week, week_day, section, building, floor), None
+
+
 @app.route('/api/free_classrooms', methods=['GET'])
 def get_free_classrooms():
     week = request.args.get('week')
@@ -84,6 +259,7 @@ def get_free_classrooms():
     floor = request.args.get('floor')
 
     if not week or not week_day or not section:
+        REQUEST_ERRORS.inc(endpoint='get_free_classrooms', reason='missing_params')
         return jsonify({
             'success': False,
             'data': None,
@@ -95,6 +271,7 @@ def get_free_classrooms():
         if week < 1 or week > 18:
             raise ValueError
     except ValueError:
+        REQUEST_ERRORS.inc(endpoint='get_free_classrooms', reason='invalid_week')
         return jsonify({
             'success': False,
             'data': None,
@@ -102,22 +279,37 @@ def get_free_classrooms():
         }), 400
 
     if section not in SECTION_ORDER:
+        REQUEST_ERRORS.inc(endpoint='get_free_classrooms', reason='invalid_section')
         return jsonify({
             'success': False,
             'data': None,
             'msg': f'节次参数无效，必须是以下之一: {", ".join(SECTION_ORDER)}'
         }), 400
 
-    data, error = load_classroom_data()
+    try:
+        # 相同查询正在计算时直接等待共享结果；需要新计算且并发已达上限时立即拒绝，避免请求无限排队
+        key = (week, week_day, section, building or None, floor or None)
+        (results, error), shared = QUERY_FLIGHT.do(
+            key, lambda: query_free_classrooms(week, week_day, section, building, floor), QUERY_INFLIGHT)
+    except OverloadedError:
+        THROTTLED_REQUESTS.inc(reason='overload')
+        response = jsonify({
+            'success': False,
+            'data': None,
+            'msg': '服务繁忙，请稍后再试'
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    COALESCED_QUERIES.inc(result='shared' if shared else 'leader')
+
     if error:
+        REQUEST_ERRORS.inc(endpoint='get_free_classrooms', reason='load_failed')
         return jsonify({
             'success': False,
             'data': None,
             'msg': error
         }), 500
 
-    results = find_free_classrooms(data, week, week_day, section, building, floor)
-
     return jsonify({
         'success': True,
         'data': results,
@@ -125,6 +317,85 @@ def get_free_classrooms():
     })
 
 
+def compute_free_now(week, week_day, section):
+    """整个校区某一时段的空闲教室（不过滤教学楼/楼层），与相同参数的查询合并"""
+    (results, error), _ = QUERY_FLIGHT.do(
+        (week, week_day, section, None, None),
+        lambda: query_free_classrooms(week, week_day, section))
+    return results, error
+
+
+def get_free_now_scheduler():
+    """首次查询时创建并启动后台预计算线程"""
+    global FREE_NOW_SCHEDULER
+    if FREE_NOW_SCHEDULER is None:
+        with _scheduler_lock:
+            if FREE_NOW_SCHEDULER is None:
+                scheduler = FreeNowScheduler(
+                    CALENDAR, compute_free_now, dataset_stamp,
+                    settings.get_int('calendar', 'refreshInterval', fallback=60))
+                scheduler.start()
+                FREE_NOW_SCHEDULER = scheduler
+    return FREE_NOW_SCHEDULER
+
+
+@app.route('/api/free_now', methods=['GET'])
+def get_free_now():
+    """当前时段的空闲教室，周次、星期、节次由服务端根据校历计算"""
+    building = request.args.get('building')
+    floor = request.args.get('floor')
+
+    if CALENDAR is None:
+        REQUEST_ERRORS.inc(endpoint='get_free_now', reason='no_calendar')
+        return jsonify({
+            'success': False,
+            'data': None,
+            'msg': '未配置校历，请使用 /api/free_classrooms 查询'
+        }), 503
+
+    slot = CALENDAR.resolve()
+    if slot is None:
+        return jsonify({
+            'success': False,
+            'data': None,
+            'msg': '当前不在上课时段（不在教学周内、周末或今日课程已结束）'
+        })
+
+    scheduler = get_free_now_scheduler()
+    results = scheduler.get(slot)
+    if results is not None:
+        CACHE_LOOKUPS.inc(cache='free_now', result='hit')
+    else:
+        CACHE_LOOKUPS.inc(cache='free_now', result='miss')
+        stamp = dataset_stamp()
+        results, error = compute_free_now(slot.week, slot.week_day, slot.section)
+        if error:
+            REQUEST_ERRORS.inc(endpoint='get_free_now', reason='load_failed')
+            return jsonify({
+                'success': False,
+                'data': None,
+                'msg': error
+            }), 500
+        scheduler.put(slot, results, stamp)
+
+    if building or floor:
+        results = [room for room in results
+                   if (not building or room['building'] == building) and (not floor or room['floor'] == floor)]
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'week': slot.week,
+            'weekDay': slot.week_day,
+            'section': slot.section,
+            'start': slot.start.strftime('%H:%M'),
+            'end': slot.end.strftime('%H:%M'),
+            'classrooms': results
+        },
+        'msg': f'当前为第 {slot.week} 周{slot.week_day} {slot.section} 节，找到 {len(results)} 个教室'
+    })
+
+
 @app.route('/api/announcement', methods=['GET'])
 def get_announcement():
     """获取公告内容"""
@@ -146,6 +417,63 @@ def get_info():
     return jsonify({"success": True, "data": info})
 
 
+def client_address():
+    """
+    客户端 IP，部署在反向代理之后时取 X-Forwarded-For 的最后一个地址（由代理追加，客户端无法伪造；
+    前面的地址来自客户端自带的请求头，不可信）
+    """
+    if TRUST_PROXY:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.remote_addr or 'unknown'
+
+
+def get_metrics():
+    """Prometheus 指标"""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+if metrics.ENABLED:
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unknown'
+            REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+            REQUEST_TOTAL.inc(endpoint=endpoint, status=str(response.status_code))
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', get_metrics, methods=['GET'])
+
+
+# 在计时钩子之后注册，被限流的请求同样计入请求指标
+if RATE_LIMIT_ENABLED:
+    @app.before_request
+    def _rate_limit():
+        if not request.path.startswith('/api/'):
+            return None
+        allowed, retry_after = RATE_LIMITER.allow(client_address())
+        if allowed:
+            return None
+        THROTTLED_REQUESTS.inc(reason='rate_limit')
+        response = jsonify({
+            'success': False,
+            'data': None,
+            'msg': '请求过于频繁，请稍后再试'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
 if __name__ == '__main__':
+    # 启动时预先加载数据，首个请求无需等待；sqlite 模式直接查询数据库，不在内存中保留数据
+    if SQLITE_STORE is None:
+        load_classroom_data()
     # 部署时可修改host和port
     app.run(host='0.0.0.0', port=5050)
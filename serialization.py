@@ -0,0 +1,107 @@
+"""
+JSON 编解码层：优先使用 orjson，其次 msgspec，都不可用时回退到标准库 json
+
+本项目写出的数据（字符串、64 位以内整数、布尔、null、列表和字典）在各后端下输出逐字节一致
+（UTF-8 原样输出中文、紧凑分隔符或两空格缩进），更换后端不会影响备份快照的对比。
+以下情况不一致：浮点数的指数写法（标准库为 1e+16、1e-07，orjson/msgspec 为 1e16、1e-7），
+以及超过 64 位的整数（orjson 无法序列化，其他后端可以）。
+"""
+import json
+
+import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# 默认紧凑输出，仅调试时在 config.ini 中开启 [json] pretty=true
+PRETTY = settings.get_bool('json', 'pretty', fallback=False)
+
+
+def _default(obj):
+    """处理 numpy 整数等非内置类型"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+def _select_backend(name):
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise ImportError("配置使用 orjson，但未安装 orjson")
+        return 'orjson'
+    if name == 'msgspec' or (name == 'auto' and msgspec is not None):
+        if msgspec is None:
+            raise ImportError("配置使用 msgspec，但未安装 msgspec")
+        return 'msgspec'
+    return 'json'
+
+
+BACKEND = _select_backend(settings.get_str('json', 'backend', fallback='auto'))
+
+if BACKEND == 'orjson':
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _dumps(obj, pretty, sort_keys):
+        option = _ORJSON_OPTIONS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    _loads = orjson.loads
+
+elif BACKEND == 'msgspec':
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    _sorted_encoder = msgspec.json.Encoder(enc_hook=_default, order='sorted')
+    _decoder = msgspec.json.Decoder()
+
+    def _dumps(obj, pretty, sort_keys):
+        data = (_sorted_encoder if sort_keys else _encoder).encode(obj)
+        return msgspec.json.format(data, indent=2) if pretty else data
+
+    _loads = _decoder.decode
+
+else:
+    def _dumps(obj, pretty, sort_keys):
+        if pretty:
+            text = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=_default)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys,
+                              default=_default)
+        return text.encode('utf-8')
+
+    _loads = json.loads
+
+
+def dumps(obj, pretty=None, sort_keys=False):
+    """序列化为 UTF-8 字节串，pretty 为 None 时使用配置；sort_keys 时按键排序"""
+    return _dumps(obj, PRETTY if pretty is None else pretty, sort_keys)
+
+
+def dumps_str(obj, pretty=None, sort_keys=False):
+    return dumps(obj, pretty, sort_keys).decode('utf-8')
+
+
+def loads(data):
+    """反序列化 bytes 或 str"""
+    return _loads(data)
+
+
+def dump_file(obj, file_path, pretty=None):
+    with open(file_path, 'wb') as f:
+        f.write(dumps(obj, pretty))
+
+
+def load_file(file_path):
+    with open(file_path, 'rb') as f:
+        return _loads(f.read())
@@ -0,0 +1,32 @@
+import configparser
+
+# 配置文件路径（部署时可修改）
+CONFIG_FILE = 'config.ini'
+
+_config = None
+
+
+def get_config():
+    """读取 config.ini，只在首次调用时解析"""
+    global _config
+    if _config is None:
+        config = configparser.ConfigParser()
+        config.read(CONFIG_FILE, encoding='utf-8')
+        _config = config
+    return _config
+
+
+def get_str(section, key, fallback=None):
+    return get_config().get(section, key, fallback=fallback)
+
+
+def get_int(section, key, fallback=None):
+    return get_config().getint(section, key, fallback=fallback)
+
+
+def get_float(section, key, fallback=None):
+    return get_config().getfloat(section, key, fallback=fallback)
+
+
+def get_bool(section, key, fallback=False):
+    return get_config().getboolean(section, key, fallback=fallback)
@@ -0,0 +1,112 @@
+"""
+请求合并与限流
+
+- SingleFlight：相同参数的并发请求只计算一次，其余请求等待并共享结果
+- TokenBucketLimiter：按客户端（IP）的令牌桶限流，客户端数量有上限，按最近使用淘汰
+- InflightLimiter：限制同时实际计算的查询数量，超出时立即拒绝而不是排队
+  （只限制 SingleFlight 中负责计算的请求，等待共享结果的请求不占用名额）
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class OverloadedError(Exception):
+    """同时计算的查询已达上限"""
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, limiter=None):
+        """
+        执行 func()，同一 key 正在执行时等待其结果
+        :param limiter: InflightLimiter，只有需要实际计算时才占用名额，名额不足时抛出 OverloadedError
+        :return: (结果, 是否共享了其他请求的结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                if limiter is not None and not limiter.try_acquire():
+                    raise OverloadedError()
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+            if limiter is not None:
+                limiter.release()
+        return call.result, False
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate, burst, max_clients=10000):
+        """
+        :param rate: 每秒补充的令牌数
+        :param burst: 令牌桶容量（允许的突发请求数）
+        :param max_clients: 最多记录的客户端数量，超出时淘汰最久未访问的客户端
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [令牌数, 上次更新时间]
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """
+        尝试消耗一个令牌
+        :return: (是否允许, 需要等待的秒数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / self.rate if self.rate > 0 else 1.0
+
+
+class InflightLimiter:
+    def __init__(self, limit):
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def try_acquire(self):
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
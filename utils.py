@@ -1,12 +1,13 @@
-import json
 import os
 
-import pandas as pd
-
+import serialization
 from ClassRoom import ClassRoom
 
 
 def read_class_room_data(excel_path):
+    # pandas 导入较慢，只在读取 Excel 时导入
+    import pandas as pd
+
     df = pd.read_excel(excel_path)
 
     # 确保列名和 Excel 表格一致
@@ -33,12 +34,16 @@ def convert_to_json(class_rooms):
     # 将 ClassRoom 对象列表转换为字典列表
     data = [room.__dict__ for room in class_rooms]
 
-    # 转为 JSON 字符串，确保中文正常显示
-    json_str = json.dumps(data, ensure_ascii=False, indent=4)
+    # 转为 JSON 字符串，中文原样输出
+    json_str = serialization.dumps_str(data)
     return json_str
 
 
 def save_json_to_file(json_data, file_path):
+    if isinstance(json_data, bytes):
+        with open(file_path, 'wb') as f:
+            f.write(json_data)
+        return
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(json_data)
 
@@ -47,5 +52,4 @@ def load_json_from_file(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"文件不存在: {file_path}")
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return serialization.load_file(file_path)